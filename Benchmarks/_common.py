@@ -0,0 +1,14 @@
+"""Helpers shared by the benchmarks."""
+import importlib.util
+import os
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_form_filter():
+    """Load the Form Filter component file the way Langflow loads custom components."""
+    path = os.path.join(ROOT, "Components", "Forms", "form_filter.py")
+    spec = importlib.util.spec_from_file_location("form_filter", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,60 @@
+"""Per-document time with a fresh CDocBuilder per file vs. a reused EnginePool.
+
+Runs over the Form 8822 samples in Files/ and needs langflow with the
+docbuilder module installed:
+
+    python Benchmarks/engine_pool_benchmark.py --rounds 20
+"""
+import argparse
+import glob
+import os
+import time
+
+from _common import ROOT, load_form_filter
+
+
+def run(form_filter, paths, rounds, pool):
+    timings = []
+    for _ in range(rounds):
+        for path in paths:
+            start = time.perf_counter()
+            file = form_filter.File()
+            if file.open(path, pool=pool):
+                file.getFormValueByKey("your_name")
+                file.close()
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(name, timings):
+    timings = sorted(timings)
+    mean = sum(timings) / len(timings)
+    median = timings[len(timings) // 2]
+    print(f"{name:>14}: {len(timings)} docs, mean {mean * 1000:.1f} ms, median {median * 1000:.1f} ms")
+    return mean
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", default=os.path.join(ROOT, "Files", "Change of address (Form 8822)_*.pdf"))
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--max-documents", type=int, default=100)
+    args = parser.parse_args()
+
+    form_filter = load_form_filter()
+    paths = sorted(glob.glob(args.files))
+    if not paths:
+        parser.error(f"no files match {args.files}")
+
+    # warm up the library once so the first measured open is not an outlier
+    run(form_filter, paths[:1], 1, None)
+
+    fresh = report("fresh engine", run(form_filter, paths, args.rounds, None))
+    pool = form_filter.EnginePool(args.max_documents)
+    pooled = report("engine pool", run(form_filter, paths, args.rounds, pool))
+    pool.close()
+    print(f"{'speedup':>14}: {fresh / pooled:.2f}x ({pool.created} engines created, {pool.recycled} recycled, {pool.unhealthy} failed the health check)")
+
+
+if __name__ == "__main__":
+    main()
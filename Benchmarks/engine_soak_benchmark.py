@@ -0,0 +1,73 @@
+"""Resident memory over many File open/close cycles, to catch engine leaks.
+
+Opens and closes the Form 8822 samples in Files/ --cycles times through one
+EnginePool and samples RSS every --sample-every cycles. A flat curve means
+documents and engines are released; the leak tracker must also be empty at
+the end. Needs langflow with the docbuilder module installed:
+
+    python Benchmarks/engine_soak_benchmark.py --cycles 100000 --output soak.json
+"""
+import argparse
+import glob
+import json
+import os
+import time
+
+from _common import ROOT, load_form_filter
+
+
+def rss_kb():
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") // 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", default=os.path.join(ROOT, "Files", "Change of address (Form 8822)_*.pdf"))
+    parser.add_argument("--cycles", type=int, default=100000)
+    parser.add_argument("--sample-every", type=int, default=1000)
+    parser.add_argument("--max-documents", type=int, default=100)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    form_filter = load_form_filter()
+    form_filter.LEAKS.enabled = True
+    paths = sorted(glob.glob(args.files))
+    if not paths:
+        parser.error(f"no files match {args.files}")
+
+    pool = form_filter.EnginePool(args.max_documents)
+    samples = []
+    start = time.perf_counter()
+    for cycle in range(args.cycles):
+        with form_filter.File() as file:
+            if file.open(paths[cycle % len(paths)], pool=pool):
+                file.getFormValueByKey("your_name")
+        if cycle % args.sample_every == 0 or cycle == args.cycles - 1:
+            samples.append({"cycle": cycle, "rss_kb": rss_kb(), "seconds": time.perf_counter() - start})
+    pool.close()
+
+    # growth over the second half, the first half includes warm-up allocations
+    half = samples[len(samples) // 2:]
+    growth = half[-1]["rss_kb"] - half[0]["rss_kb"] if len(half) > 1 else 0
+    leaks = form_filter.LEAKS.report()
+    report = {
+        "cycles": args.cycles,
+        "engines_created": pool.created,
+        "rss_growth_second_half_kb": growth,
+        "leaked_documents": len(leaks["open_documents"]),
+        "leaked_builders": len(leaks["open_builders"]),
+        "samples": samples,
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""Per-stage timings of the form-filter pipeline over a reproducible synthetic corpus.
+
+Copies the Form 8822 samples in Files/ into a corpus of --documents files with
+seeded random form values, then times open, form enumeration, filter
+evaluation, value extraction and close for every document. The report is JSON
+so runs before and after a docbuilder upgrade can be diffed:
+
+    python Benchmarks/form_filter_benchmark.py --documents 500 --output before.json
+
+Needs langflow with the docbuilder module installed.
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+
+from _common import ROOT, load_form_filter
+
+STAGES = ["open", "enumerate", "filter", "extract", "close"]
+
+DEFAULT_PREDICATES = [
+    {"key": "your_name", "op": "exists"},
+    {"key": "joint_return_separation_checkbox", "op": "eq", "operand": True},
+    {"key": "signature_date", "op": "gt", "operand": 0.0},
+]
+DEFAULT_OUTPUT_KEYS = ["your_name", "new_address", "daytime_phone", "individual_tax_returns", "signature_date"]
+
+# Runs inside the document. A small LCG keeps the values a function of the seed
+# alone, so the same --seed always yields the same corpus.
+RANDOMIZE_SCRIPT = """
+(function () {
+    var state = %d;
+    function next() {
+        state = (state * 1103515245 + 12345) %% 2147483648;
+        return state / 2147483648;
+    }
+    var words = ["Main", "Oak", "Pine", "Maple", "Cedar", "Elm", "Lake", "Hill"];
+    var forms = Api.GetDocument().GetAllForms();
+    for (var i = 0; i < forms.length; i++) {
+        var form = forms[i];
+        var type = form.GetFormType();
+        if (type === "textForm") {
+            if (next() < 0.2) {
+                form.SetText("");
+            } else {
+                form.SetText(Math.floor(next() * 9999) + " " + words[Math.floor(next() * words.length)] + " St");
+            }
+        } else if (type === "checkBoxForm" || type === "radioButtonForm") {
+            form.SetChecked(next() < 0.5);
+        } else if (type === "dateForm") {
+            form.SetTime(Date.UTC(2000, 0, 1) + Math.floor(next() * 25 * 365) * 86400000);
+        }
+    }
+})();
+"""
+
+
+def build_corpus(form_filter, samples, directory, documents, seed):
+    """Write `documents` copies of the samples with seeded form values, reusing an existing corpus."""
+    os.makedirs(directory, exist_ok=True)
+    pool = form_filter.EnginePool()
+    paths = []
+    try:
+        for n in range(documents):
+            path = os.path.join(directory, f"doc_{seed}_{n:06d}.pdf")
+            paths.append(path)
+            if os.path.exists(path):
+                continue
+            builder = pool.acquire()
+            if builder.OpenFile(samples[n % len(samples)], "") != 0:
+                pool.release(builder, error=True)
+                raise RuntimeError(f"cannot open sample {samples[n % len(samples)]}")
+            builder.ExecuteCommand(RANDOMIZE_SCRIPT % ((seed * 7919 + n) % 2147483648))
+            builder.SaveFile("pdf", path)
+            builder.CloseFile()
+            pool.release(builder)
+    finally:
+        pool.close()
+    return paths
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def summarize(timings):
+    return {
+        "mean_ms": sum(timings) / len(timings) * 1000 if timings else None,
+        "p50_ms": percentile(timings, 0.50) * 1000 if timings else None,
+        "p99_ms": percentile(timings, 0.99) * 1000 if timings else None,
+    }
+
+
+def run(form_filter, paths, predicates, output_keys, pool, project):
+    keys = None
+    if project:
+        keys = list(dict.fromkeys([p["key"] for p in predicates] + list(output_keys)))
+
+    stages = {stage: [] for stage in STAGES}
+    documents = []
+    passed = failed = 0
+    start = time.perf_counter()
+    for path in paths:
+        times = {}
+        file = form_filter.File()
+
+        t = time.perf_counter()
+        opened = file.openDocument(path, pool=pool)
+        times["open"] = time.perf_counter() - t
+        if not opened:
+            failed += 1
+            continue
+
+        try:
+            t = time.perf_counter()
+            file.loadForms(keys)
+            times["enumerate"] = time.perf_counter() - t
+
+            t = time.perf_counter()
+            matched = all(form_filter.evaluate_predicate(file, p) for p in predicates)
+            times["filter"] = time.perf_counter() - t
+
+            t = time.perf_counter()
+            if matched:
+                form_filter.build_record(file, path, output_keys)
+                passed += 1
+            times["extract"] = time.perf_counter() - t
+        finally:
+            t = time.perf_counter()
+            file.close()
+            times["close"] = time.perf_counter() - t
+
+        for stage, seconds in times.items():
+            stages[stage].append(seconds)
+        documents.append(sum(times.values()))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "documents": len(paths),
+        "passed": passed,
+        "failed_to_open": failed,
+        "seconds": elapsed,
+        "docs_per_sec": len(paths) / elapsed if elapsed else None,
+        "latency": summarize(documents),
+        "stages": {stage: summarize(timings) for stage, timings in stages.items()},
+    }
+
+
+def peak_rss_kb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes everywhere else
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", default=os.path.join(ROOT, "Files", "Change of address (Form 8822)_*.pdf"))
+    parser.add_argument("--corpus", default=os.path.join(tempfile.gettempdir(), "form_filter_corpus"))
+    parser.add_argument("--documents", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rounds", type=int, default=1)
+    parser.add_argument("--predicates", help="JSON list of predicates, defaults to a name/checkbox/date filter")
+    parser.add_argument("--output-keys", default=",".join(DEFAULT_OUTPUT_KEYS))
+    parser.add_argument("--no-pool", action="store_true", help="open every document with a fresh engine")
+    parser.add_argument("--project-keys", action="store_true", help="load only the keys the filters and outputs need")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    form_filter = load_form_filter()
+    samples = sorted(glob.glob(args.files))
+    if not samples:
+        parser.error(f"no files match {args.files}")
+
+    predicates = json.loads(args.predicates) if args.predicates else DEFAULT_PREDICATES
+    output_keys = [key.strip() for key in args.output_keys.split(",") if key.strip()]
+
+    paths = build_corpus(form_filter, samples, args.corpus, args.documents, args.seed)
+
+    pool = None if args.no_pool else form_filter.EnginePool()
+    try:
+        # warm up the library once so the first measured open is not an outlier
+        run(form_filter, paths[:1], predicates, output_keys, pool, args.project_keys)
+        rounds = [
+            run(form_filter, paths, predicates, output_keys, pool, args.project_keys) for _ in range(args.rounds)
+        ]
+    finally:
+        if pool is not None:
+            pool.close()
+
+    report = {
+        "docbuilder_version": form_filter.get_docbuilder_version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "corpus": {"directory": args.corpus, "documents": args.documents, "seed": args.seed},
+        "predicates": predicates,
+        "output_keys": output_keys,
+        "pool": not args.no_pool,
+        "project_keys": args.project_keys,
+        "rounds": rounds,
+        "peak_rss_kb": peak_rss_kb(),
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Cold import time of every component module of the pack.
+
+Each module is loaded the way Langflow loads custom components, in a fresh
+interpreter per round, and the heavy modules it pulled in are listed. With
+--ref the same modules are also measured at a git revision, to compare a
+change against it:
+
+    python Benchmarks/import_time_benchmark.py --rounds 10 --ref HEAD~1
+
+Needs langflow installed.
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from _common import ROOT
+
+HEAVY_MODULES = ["langflow.docbuilder", "regex", "numpy", "pyarrow", "multiprocessing", "socketserver"]
+
+# runs in the fresh interpreter: load the given files, print seconds and heavy modules
+PROBE = """
+import importlib.util, json, sys, time
+start = time.perf_counter()
+for n, path in enumerate(sys.argv[2:]):
+    spec = importlib.util.spec_from_file_location(f"component_{n}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+seconds = time.perf_counter() - start
+heavy = [name for name in json.loads(sys.argv[1]) if name in sys.modules]
+print(json.dumps({"seconds": seconds, "heavy": heavy}))
+"""
+
+
+def component_files(root):
+    return sorted(
+        os.path.relpath(path, root) for path in glob.glob(os.path.join(root, "Components", "**", "*.py"), recursive=True)
+    )
+
+
+def export_ref(ref, files, directory):
+    """Write the component files as of ref into directory, skipping files that did not exist yet."""
+    exported = []
+    for name in files:
+        result = subprocess.run(["git", "-C", ROOT, "show", f"{ref}:{name}"], capture_output=True)
+        if result.returncode != 0:
+            continue
+        path = os.path.join(directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(result.stdout)
+        exported.append(name)
+    return exported
+
+
+def probe(paths, rounds):
+    timings = []
+    heavy = []
+    for _ in range(rounds):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE, json.dumps(HEAVY_MODULES), *paths],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        result = json.loads(output)
+        timings.append(result["seconds"])
+        heavy = result["heavy"]
+    return {"median_ms": statistics.median(timings) * 1000, "min_ms": min(timings) * 1000, "heavy_modules": heavy}
+
+
+def measure(root, files, rounds):
+    report = {name: probe([os.path.join(root, name)], rounds) for name in files}
+    # what loading the whole pack for a flow costs
+    report["(all modules)"] = probe([os.path.join(root, name) for name in files], rounds)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--ref", help="git revision to compare against")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    files = component_files(ROOT)
+    report = {"rounds": args.rounds, "current": measure(ROOT, files, args.rounds)}
+    if args.ref:
+        with tempfile.TemporaryDirectory() as directory:
+            ref_files = export_ref(args.ref, files, directory)
+            report["ref"] = args.ref
+            report["at_ref"] = measure(directory, ref_files, args.rounds)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Memory per result row: a list of record dicts vs. a RecordTable.
+
+Builds --rows synthetic FormFilter records with the output keys of the
+Form 8822 samples and measures what holding them costs with tracemalloc:
+as plain dicts, as the table the Paths output reads, and as a component
+holds them after its Data output was built.
+
+    python Benchmarks/record_memory_benchmark.py --rows 500000
+
+Needs langflow installed, form_filter.py imports it.
+"""
+import argparse
+import json
+import random
+import tracemalloc
+
+from _common import load_form_filter
+
+OUTPUT_KEYS = ["your_name", "new_address", "daytime_phone", "joint_return_separation_checkbox", "signature_date"]
+
+
+def make_records(rows, seed):
+    """Records as build_record produces them: a fresh dict per document."""
+    rng = random.Random(seed)
+    for n in range(rows):
+        yield {
+            "file_path": f"/archive/forms/{n // 1000:04d}/form_{n:08d}.pdf",
+            "your_name": f"Name {rng.randrange(100000)}",
+            "new_address": f"{rng.randrange(9999)} Main St",
+            "daytime_phone": f"555-{rng.randrange(10000):04d}",
+            "joint_return_separation_checkbox": rng.random() < 0.5,
+            "signature_date": float(rng.randrange(946684800, 1735689600) * 1000),
+        }
+
+
+def measure(build):
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current
+
+
+def data_output(form_filter, rows, seed):
+    """The component and the Data it built, with the run's table in its results cache."""
+    component = form_filter.FormFilterComponent(paths=[], fields=[], output_keys=None)
+    table = form_filter.RecordTable.from_records(make_records(rows, seed), OUTPUT_KEYS)
+    component._results_cache = (component._results_cache_key(), table)
+    del table
+    return component, component.build_data()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    form_filter = load_form_filter()
+
+    records, dict_bytes = measure(lambda: list(make_records(args.rows, args.seed)))
+    del records
+    table, table_bytes = measure(
+        lambda: form_filter.RecordTable.from_records(make_records(args.rows, args.seed), OUTPUT_KEYS)
+    )
+    # the paths output before and after: a copied list vs. the shared column
+    _, paths_copy_bytes = measure(lambda: [record["file_path"] for record in table])
+    _, paths_view_bytes = measure(table.paths)
+    _, data_output_bytes = measure(lambda: data_output(form_filter, args.rows, args.seed))
+
+    report = {
+        "rows": args.rows,
+        "columns": len(OUTPUT_KEYS) + 1,
+        "dicts_bytes_per_row": dict_bytes / args.rows,
+        "table_bytes_per_row": table_bytes / args.rows,
+        "saving": 1 - table_bytes / dict_bytes,
+        # what a flow with the Data output wired keeps: the dicts, the table is gone
+        "data_output_bytes_per_row": data_output_bytes / args.rows,
+        "paths_copy_bytes": paths_copy_bytes,
+        "paths_view_bytes": paths_view_bytes,
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,6 @@
 from langflow.custom import Component
 from langflow.io import Output
 from langflow.inputs.inputs import MessageTextInput, BoolInput
-from regex import T
 
 class CheckBoxComponent(Component):
     display_name = "Checkbox Filter"
@@ -43,3 +42,6 @@ class CheckBoxComponent(Component):
         if self.checked == file.getFormValueByKey(self.key, self.tag):
             return True
         return False
+
+    def get_predicates(self) -> list[dict]:
+        return [{"key": self.key, "tag": self.tag, "op": "eq", "operand": self.checked}]
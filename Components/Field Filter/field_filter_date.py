@@ -3,6 +3,7 @@ from datetime import datetime
 
 from langflow.custom import Component
 from langflow.io import (
+    BoolInput,
     MessageTextInput,
     Output,
 )
@@ -54,6 +55,20 @@ class DateKeyComponent(Component):
             input_types=[],
             info="Value of form for key:2.",
         ),
+        BoolInput(
+            name="include_from",
+            display_name="Include From",
+            info="Let documents dated exactly on the From date pass.",
+            value=False,
+            advanced=True,
+        ),
+        BoolInput(
+            name="include_to",
+            display_name="Include To",
+            info="Let documents dated exactly on the To date pass.",
+            value=False,
+            advanced=True,
+        ),
     ]
 
     outputs = [
@@ -64,53 +79,113 @@ class DateKeyComponent(Component):
         ),
     ]
 
-    def parse_date(self, date_str) -> int:
+    # first match wins, the placeholder format comes first
+    DATE_FORMATS = ["%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%Y-%m-%d"]
+
+    def parse_date(self, date_str) -> float | None:
+        """Epoch milliseconds of a date, the unit GetTime() reports form dates in."""
         if not date_str:
             return None
-        try:
-            dt = datetime.strptime(str(date_str), "%d-%m-%Y")
-            return int(dt.timestamp())
-        except Exception:
-            return None
+        date_str = str(date_str).strip()
+        for date_format in self.DATE_FORMATS:
+            try:
+                return datetime.strptime(date_str, date_format).timestamp() * 1000
+            except ValueError:
+                continue
+        return None
 
     def get_field_names(self) -> List[str | None]:
         key1 = getattr(self, "field_1_name", None)
         from_date_str = getattr(self, "field_2_name", None)
         key2 = getattr(self, "field_3_name", None)
         to_date_str = getattr(self, "field_4_name", None)
-        #raise Exception(f"{to_date_str=}")
         tag1 = getattr(self, "tag_1", None)
         tag2 = getattr(self, "tag_2", None)
         return [key1, tag1, from_date_str, key2, tag2, to_date_str]
 
-    def process(self, file) -> bool:
-        config_values: List[str] = self.get_field_names()
-        key1, tag1, from_date_str, key2, tag2, to_date_str = config_values
-        #raise Exception(f"{to_date_str=}")
+    def get_bounds(self) -> tuple:
+        """(key1, tag1, from, key2, tag2, to) with the dates parsed, once per set of settings."""
+        config_values = tuple(self.get_field_names())
+        compiled = getattr(self, "_bounds", None)
+        if compiled is None or compiled[0] != config_values:
+            key1, tag1, from_date_str, key2, tag2, to_date_str = config_values
+            input_from_date = self.parse_date(from_date_str) if key1 else None
+            input_to_date = self.parse_date(to_date_str) if key2 else None
+            compiled = (config_values, (key1, tag1, input_from_date, key2, tag2, input_to_date))
+            self._bounds = compiled
+        return compiled[1]
 
-        if not key1 and not key2:
-            return False
+    @property
+    def from_inclusive(self) -> bool:
+        return bool(getattr(self, "include_from", False))
 
-        input_from_date: int | None = self.parse_date(from_date_str)
-        input_to_date: int | None = self.parse_date(to_date_str)
-        file_to_date: int | None = file.getFormValueByKey(key2,tag2)
-        #raise Exception(f"{get_form_value(forms, key1,tag1)=}") 
-        file_from_date: int | None = file.getFormValueByKey(key1,tag1)
+    @property
+    def to_inclusive(self) -> bool:
+        return bool(getattr(self, "include_to", False))
 
-        #raise Exception(f"{config_values=}")
-        #raise Exception(f"{input_to_date=}, {input_from_date=},{file_to_date=},{file_from_date=}")
-        if input_to_date and input_from_date and key1 and key2:
-            raise Exception(f"{input_to_date=}, {input_from_date=},{file_to_date=},{file_from_date=},{(input_to_date > file_to_date) and (input_from_date < file_from_date)=}") 
-            return (input_to_date > file_to_date) and (input_from_date < file_from_date)
+    def in_range(self, from_value, to_value, input_from_date, input_to_date) -> bool:
+        if input_from_date is not None:
+            if from_value is None:
+                return False
+            if from_value < input_from_date or (from_value == input_from_date and not self.from_inclusive):
+                return False
+        if input_to_date is not None:
+            if to_value is None:
+                return False
+            if to_value > input_to_date or (to_value == input_to_date and not self.to_inclusive):
+                return False
+        return True
 
-        elif input_from_date and key1:
-            #raise Exception(f"{file_from_date=}, {input_from_date=},{input_from_date < file_from_date=}") 
-            return input_from_date < file_from_date
+    def process(self, file) -> bool:
+        key1, tag1, input_from_date, key2, tag2, input_to_date = self.get_bounds()
+        if input_from_date is None and input_to_date is None:
+            return False
 
-        elif input_to_date and key2:
-            return file_to_date < input_to_date
+        file_from_date = file.getFormValueByKey(key1, tag1) if input_from_date is not None else None
+        if input_to_date is None:
+            file_to_date = None
+        elif input_from_date is not None and (key2, tag2) == (key1, tag1):
+            # one form bounded on both sides is read once
+            file_to_date = file_from_date
         else:
-            return False
+            file_to_date = file.getFormValueByKey(key2, tag2)
+        return self.in_range(file_from_date, file_to_date, input_from_date, input_to_date)
+
+    def evaluate_batch(self, from_values, to_values=None):
+        """Boolean mask over many documents at once.
+
+        from_values and to_values are the GetTime().ToDouble() values of
+        Key 1 and Key 2 per document, NaN or None where the form is missing.
+        to_values defaults to from_values, for a range on a single key.
+        """
+        import numpy as np
+
+        _, _, input_from_date, _, _, input_to_date = self.get_bounds()
+        from_values = np.asarray(from_values, dtype=float)
+        to_values = from_values if to_values is None else np.asarray(to_values, dtype=float)
+        if input_from_date is None and input_to_date is None:
+            return np.zeros(len(from_values), dtype=bool)
+
+        # NaN compares false, so documents without the form never pass
+        mask = np.ones(len(from_values), dtype=bool)
+        if input_from_date is not None:
+            mask &= from_values >= input_from_date if self.from_inclusive else from_values > input_from_date
+        if input_to_date is not None:
+            mask &= to_values <= input_to_date if self.to_inclusive else to_values < input_to_date
+        return mask
+
+    def get_predicates(self) -> list[dict] | None:
+        key1, tag1, input_from_date, key2, tag2, input_to_date = self.get_bounds()
+
+        predicates = []
+        if input_from_date is not None:
+            op = "gte" if self.from_inclusive else "gt"
+            predicates.append({"key": key1, "tag": tag1, "op": op, "operand": input_from_date})
+        if input_to_date is not None:
+            op = "lte" if self.to_inclusive else "lt"
+            predicates.append({"key": key2, "tag": tag2, "op": op, "operand": input_to_date})
+        # process() rejects every document in this case, leave it to process()
+        return predicates or None
 
     def build_data(self) -> Component:
         return self
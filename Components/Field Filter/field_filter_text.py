@@ -1,11 +1,6 @@
 from langflow.custom import Component
 from langflow.io import Output
-from langflow.schema import Data
-from langflow.inputs.inputs import IntInput, MessageTextInput
-from langflow.field_typing.range_spec import RangeSpec
-from langflow.schema.dotdict import dotdict
-
-from langflow.docbuilder import docbuilder
+from langflow.inputs.inputs import MessageTextInput
 
 class ExistComponent(Component):
     display_name = "Text Key Filter"
@@ -50,4 +45,7 @@ class ExistComponent(Component):
             return True
         return False
 
+    def get_predicates(self) -> list[dict]:
+        return [{"key": self.key, "tag": self.tag, "op": "eq", "operand": self.value}]
+
 
@@ -1,5 +1,5 @@
 from langflow.custom import Component
-from langflow.io import Output, DropdownInput
+from langflow.io import Output
 from langflow.schema import Data
 from langflow.inputs.inputs import IntInput, MessageTextInput
 from langflow.field_typing.range_spec import RangeSpec
@@ -1,17 +1,207 @@
-from typing import Any, Dict, List
+import hashlib
+import heapq
+import itertools
+import json
+import mmap
+import operator
+import os
+import re
+import sqlite3
+import sys
+import time
+from collections import OrderedDict, deque
+from collections.abc import Sequence
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List
 
 from langflow.custom import Component
-from langflow.docbuilder import docbuilder
 from langflow.inputs import Input
 from langflow.inputs.inputs import (
+    BoolInput,
     DataInput,
+    DropdownInput,
+    FloatInput,
+    IntInput,
+    MessageTextInput,
 )
 from langflow.io import Output
 from langflow.schema import Data
 
+# imported by load_docbuilder() once a document is opened: loading it starts the engine library
+docbuilder = None
+
+
+def load_docbuilder():
+    global docbuilder
+    if docbuilder is None:
+        from langflow.docbuilder import docbuilder as module
+
+        docbuilder = module
+    return docbuilder
+
+
+class LeakTracker:
+    """Debug bookkeeping of the documents and engines currently open.
+
+    Off unless FORM_FILTER_TRACK_LEAKS is set or `enabled` is switched on;
+    when on, every open records the stack that opened it.
+    """
+
+    def __init__(self):
+        self.enabled = bool(os.environ.get("FORM_FILTER_TRACK_LEAKS"))
+        # id -> (file path or None, stack)
+        self.documents = {}
+        self.builders = {}
+
+    def _stack(self) -> str:
+        import traceback
+
+        return "".join(traceback.format_stack(limit=8)[:-2])
+
+    def builder_created(self, builder):
+        if self.enabled:
+            self.builders[id(builder)] = (None, self._stack())
+
+    def builder_destroyed(self, builder):
+        self.builders.pop(id(builder), None)
+
+    def document_opened(self, file, file_path):
+        if self.enabled:
+            self.documents[id(file)] = (file_path, self._stack())
+
+    def document_closed(self, file):
+        self.documents.pop(id(file), None)
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "open_documents": [{"file_path": path, "stack": stack} for path, stack in self.documents.values()],
+            "open_builders": [{"stack": stack} for _, stack in self.builders.values()],
+        }
+
+
+LEAKS = LeakTracker()
+
+
+class EnginePool:
+    """Keeps CDocBuilder engines alive across OpenFile/CloseFile cycles.
+
+    An engine is recycled once it has served max_documents documents, or
+    right away when opening or processing a document on it failed. An idle
+    engine cannot be probed, docbuilder refuses commands without an open
+    file; File checks the context of each document it opens instead and
+    counts a reused engine that fails as unhealthy.
+    """
+
+    def __init__(self, max_documents=100):
+        self.max_documents = max(1, max_documents)
+        self.created = 0
+        self.recycled = 0
+        self.unhealthy = 0
+        self._idle = []
+        self._uses = {}
+
+    def acquire(self):
+        while self._idle:
+            builder = self._idle.pop()
+            if self.is_healthy(builder):
+                return builder
+            self._discard(builder)
+        builder = load_docbuilder().CDocBuilder()
+        LEAKS.builder_created(builder)
+        self._uses[id(builder)] = 0
+        self.created += 1
+        return builder
+
+    def release(self, builder, error=False, unhealthy=False):
+        if id(builder) not in self._uses:
+            return
+        self._uses[id(builder)] += 1
+        if unhealthy:
+            self.unhealthy += 1
+        if error or self._uses[id(builder)] >= self.max_documents:
+            self._discard(builder)
+        else:
+            self._idle.append(builder)
+
+    def is_healthy(self, builder) -> bool:
+        uses = self._uses.get(id(builder))
+        return uses is not None and uses < self.max_documents
+
+    def is_reused(self, builder) -> bool:
+        return self._uses.get(id(builder), 0) > 0
+
+    def _discard(self, builder):
+        LEAKS.builder_destroyed(builder)
+        self._uses.pop(id(builder), None)
+        self.recycled += 1
+
+    def close(self):
+        for builder in self._idle:
+            self._discard(builder)
+        self._idle = []
+
+
+class FormEntry:
+    """A form with everything the getters need already pulled across the JS bridge."""
+
+    __slots__ = ("form", "key", "tag", "type", "value", "choice")
+
+    def __init__(self, form, key, tag, type, value, choice=None):
+        self.form = form
+        self.key = key
+        self.tag = tag
+        self.type = type
+        self.value = value
+        self.choice = choice
+
+
+# Runs inside the docbuilder JS context and returns every requested form as
+# one JSON string, so a document costs a single bridge round-trip.
+EXTRACT_FORMS_SCRIPT = """(function() {
+    var doc = Api.GetDocument();
+    var keys = %s;
+    var forms = [];
+    if (keys === null) {
+        forms = doc.GetAllForms();
+    } else {
+        for (var k = 0; k < keys.length; k++) {
+            forms = forms.concat(doc.GetFormsByKey(keys[k]));
+        }
+    }
+    var result = [];
+    for (var i = 0; i < forms.length; i++) {
+        var form = forms[i];
+        var type = form.GetFormType();
+        var value = null;
+        if (type == "textForm" || type == "comboBoxForm" || type == "dropDownForm") {
+            value = form.GetText();
+        } else if (type == "dateForm") {
+            value = form.GetTime();
+        } else if (type == "checkBoxForm" || type == "radioButtonForm") {
+            value = form.IsChecked();
+        }
+        result.push({
+            key: form.GetFormKey(),
+            tag: form.GetTag(),
+            type: type,
+            value: value,
+            choice: value === true ? form.GetChoiceName() : null
+        });
+    }
+    return JSON.stringify(result);
+})()"""
+
+
 class File:
+    """One document opened in a docbuilder engine.
+
+    Use it as a context manager: the document is closed and its engine
+    released on every path, a failure sends the engine to recycling.
+    """
+
     def __init__(self):
         self.builder = None
+        self.pool = None
         self.context = None
 
         # js objects
@@ -20,68 +210,225 @@ class File:
         self.document = None
         self.forms = None
 
-    def open(self, file_path, params=""):
-        self.builder = docbuilder.CDocBuilder()
+        # (key, tag) -> [FormEntry] and key -> [FormEntry], built once per document
+        self.entries = []
+        self.index = {}
+        self.key_index = {}
+        # keys fetched so far when only part of the document is loaded, None means all forms
+        self.projection = None
+        # calls made into the docbuilder engine for this document
+        self.bridge_calls = 0
 
-        res = self.builder.OpenFile(file_path, params)
-        if (res != 0):
+    def open(self, file_path, params="", pool=None, keys=None):
+        if not self.openDocument(file_path, params, pool):
             return False
+        with self.closingOnError():
+            self.loadForms(keys)
+        return True
+
+    @contextmanager
+    def closingOnError(self):
+        """Close the document if the block raises, leave it open otherwise."""
+        try:
+            yield self
+        except BaseException:
+            self.close(error=True)
+            raise
 
+    def openDocument(self, file_path, params="", pool=None):
+        self.pool = pool
+        while True:
+            if pool is not None:
+                self.builder = pool.acquire()
+            else:
+                self.builder = load_docbuilder().CDocBuilder()
+                LEAKS.builder_created(self.builder)
+            reused = pool is not None and pool.is_reused(self.builder)
+
+            res = self.builder.OpenFile(file_path, params)
+            self.bridge_calls += 1
+            if (res != 0):
+                self.releaseBuilder(error=True)
+                return False
+
+            try:
+                self.attachDocument()
+            except Exception:
+                self.context = None
+                self.globalObj = None
+                self.api = None
+                self.document = None
+                self.builder.CloseFile()
+                self.releaseBuilder(error=True, unhealthy=reused)
+                if reused:
+                    # the health check of a pooled engine: its context broke, open the document on a fresh one
+                    continue
+                raise
+            break
+        LEAKS.document_opened(self, file_path)
+        return True
+
+    def attachDocument(self):
         self.context = self.builder.GetContext()
         self.globalObj = self.context.GetGlobal()
-        self.Api = self.globalObj["Api"]
-        self.document = self.Api.GetDocument()
-        self.getAllForms()
-        return True
+        self.api = self.globalObj["Api"]
+        self.document = self.api.GetDocument()
+        self.bridge_calls += 4
+        if (self.document is None or (hasattr(self.document, "IsUndefined") and self.document.IsUndefined())):
+            msg = "The docbuilder context has no document."
+            raise RuntimeError(msg)
 
-    def close(self):
+    def releaseBuilder(self, error=False, unhealthy=False):
+        if self.pool is not None:
+            self.pool.release(self.builder, error=error, unhealthy=unhealthy)
+        else:
+            LEAKS.builder_destroyed(self.builder)
+        self.builder = None
+
+    def loadForms(self, keys=None):
+        if keys is not None:
+            self.projection = set(keys)
+        if not self.extractForms(keys):
+            # the script could not run, walk the forms over the bridge instead
+            if keys is None:
+                self.getAllForms()
+                self.buildIndex()
+            else:
+                self.projection = set()
+                for key in keys:
+                    self.loadKey(key)
+
+    def close(self, error=False):
         if (self.context is None):
             return
-        del self.forms
-        del self.document
-        del self.api
-        del self.globalObj
-        del self.context
+        # drop the JS values before the document they belong to is closed
+        self.forms = None
+        self.document = None
+        self.api = None
+        self.globalObj = None
         self.context = None
-        self.builder.CloseFile()
+        self.entries = []
+        self.index = {}
+        self.key_index = {}
+        self.projection = None
+        LEAKS.document_closed(self)
+        try:
+            self.builder.CloseFile()
+            self.bridge_calls += 1
+        except Exception:
+            error = True
+            raise
+        finally:
+            self.releaseBuilder(error=error)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close(error=exc_type is not None)
+        return False
 
     def getAllForms(self):
         if (self.context is None):
             return []
         if (self.forms is None):
             self.forms = self.document.GetAllForms()
+            self.bridge_calls += 1
         return self.forms
 
+    @classmethod
+    def fromFormMap(cls, form_map):
+        """A File answering from previously extracted forms, no document is opened."""
+        file = cls()
+        for item in form_map:
+            file.addEntry(FormEntry(None, item["key"], item["tag"], item["type"], item["value"], item["choice"]))
+        return file
+
+    def getFormMap(self):
+        return [
+            {"key": entry.key, "tag": entry.tag, "type": entry.type, "value": entry.value, "choice": entry.choice}
+            for entry in self.entries
+        ]
+
+    def extractForms(self, keys=None) -> bool:
+        """Pull the forms in one generated JS snippet and index the parsed result."""
+        script = EXTRACT_FORMS_SCRIPT % json.dumps(None if keys is None else list(keys))
+        value = load_docbuilder().CDocBuilderValue()
+        self.bridge_calls += 2
+        if not self.builder.ExecuteCommand(script, value):
+            return False
+        try:
+            form_map = json.loads(value.ToString())
+        except (TypeError, ValueError):
+            return False
+        for item in form_map:
+            form_value = item["value"]
+            if item["type"] == "dateForm" and form_value is not None:
+                form_value = float(form_value)
+            self.addEntry(FormEntry(None, item["key"], item["tag"] or "", item["type"], form_value, item["choice"]))
+        return True
+
+    def addEntry(self, entry):
+        self.entries.append(entry)
+        self.index.setdefault((entry.key, entry.tag), []).append(entry)
+        self.key_index.setdefault(entry.key, []).append(entry)
+
+    def buildIndex(self):
+        self.entries = []
+        self.index = {}
+        self.key_index = {}
+        self.indexForms(self.forms)
+
+    def loadKey(self, key):
+        self.projection.add(key)
+        if not self.extractForms([key]):
+            self.bridge_calls += 1
+            self.indexForms(self.document.GetFormsByKey(key))
+
+    def indexForms(self, forms):
+        for i in range(len(forms)):
+            form = forms[i]
+            form_type = form.GetFormType().ToString()
+            value = self.getFormValue(form, form_type)
+            # item, type, value, key and tag, each a call plus its conversion
+            self.bridge_calls += 9
+            choice = None
+            if (form_type == "checkBoxForm" or form_type == "radioButtonForm") and value:
+                choice = form.GetChoiceName().ToString()
+                self.bridge_calls += 2
+            entry = FormEntry(
+                form,
+                form.GetFormKey().ToString(),
+                form.GetTag().ToString(),
+                form_type,
+                value,
+                choice,
+            )
+            self.addEntry(entry)
+
+    def getEntries(self, key, tag=None):
+        if (self.projection is not None and key not in self.projection and self.context is not None):
+            # a key nobody announced up front is fetched on first use
+            self.loadKey(key)
+        if (tag is not None and tag != ""):
+            return self.index.get((key, tag), [])
+        return self.key_index.get(key, [])
+
     def getFormsByTag(self, tag):
         if (self.context is None):
             return []
+        self.bridge_calls += 1
         return self.document.GetFormsByTag(tag);
 
     def getFormsByKey(self, key):
-        if (self.context is None):
-            return []
-        result = []
-        for i in range(len(self.forms)):
-            form = self.forms[i]
-            if (form.GetFormKey().ToString() == key):
-                result.append(form)
-        return result
+        return [entry.form if entry.form is not None else entry for entry in self.getEntries(key)]
 
     def getFormsByKeyTag(self, key, tag=None):
-        if (self.context is None):
-            return []
-        key_tag_forms = self.forms
-        if (tag is not None and tag != ""):
-            key_tag_forms = self.getFormsByTag(tag)
-        result = []
-        for i in range(len(key_tag_forms)):
-            form = key_tag_forms[i]
-            if (form.GetFormKey().ToString() == key):
-                result.append(form)
-        return result
-
-    def getFormValue(self, form):
-        form_type = form.GetFormType().ToString()
+        return [entry.form if entry.form is not None else entry for entry in self.getEntries(key, tag)]
+
+    def getFormValue(self, form, form_type=None):
+        if form_type is None:
+            form_type = form.GetFormType().ToString()
         if form_type == "textForm":
             return form.GetText().ToString()
         elif form_type == "dateForm":
@@ -97,38 +444,1494 @@ class File:
         return None
 
     def getFormValueByKey(self, key, tag=None):
-        forms_check = self.getFormsByKeyTag(key, tag)
-        count = len(forms_check)
+        entries = self.getEntries(key, tag)
+        count = len(entries)
 
         if (0 == count):
             return None
         if (1 == count):
-            return self.getFormValue(forms_check[0])
+            return entries[0].value
 
         choice = ""
-        for i in range(count):
-            form = forms_check[i]
-            form_type = form.GetFormType().ToString()
-            if ("radioButtonForm" != form_type):
-                return self.getFormValue(form)
-            if (form.IsChecked()):
-                choice = form.GetChoiceName()
+        for entry in entries:
+            if ("radioButtonForm" != entry.type):
+                return entry.value
+            if (entry.value):
+                choice = entry.choice
         return choice
 
     def getRadioButtonValue(self, key):
-        for i in range(len(self.forms)):
-            form = self.forms[i]
-            if (form.GetFormKey().ToString() == key):
-                form_type = form.GetFormType().ToString()
-                if (form_type == "checkBoxForm" or form_type == "radioButtonForm"):
-                    if form.IsChecked().ToBool():
-                        return form.GetChoiceName().ToString()
+        for entry in self.key_index.get(key, []):
+            if (entry.type == "checkBoxForm" or entry.type == "radioButtonForm"):
+                if entry.value:
+                    return entry.choice
+        return None
+
+    def __del__(self):
+        self.close()
+
+
+_docbuilder_version = None
+
+
+def get_docbuilder_version() -> str:
+    """Fingerprint of the installed docbuilder package files: name, size and mtime.
+
+    Read from the file system so that runs answered from the cache never load
+    the library or start an engine; any upgrade of the package changes it.
+    """
+    global _docbuilder_version
+    if _docbuilder_version is None:
+        import importlib.util
+
+        try:
+            spec = importlib.util.find_spec("langflow.docbuilder")
+        except (ImportError, ValueError):
+            spec = None
+        if spec is None:
+            _docbuilder_version = "unknown"
+            return _docbuilder_version
+        directories = list(spec.submodule_search_locations or [os.path.dirname(spec.origin)])
+        digest = hashlib.sha256()
+        for directory in directories:
+            for root, subdirectories, files in os.walk(directory):
+                subdirectories[:] = sorted(d for d in subdirectories if d != "__pycache__")
+                for name in sorted(files):
+                    try:
+                        stat = os.stat(os.path.join(root, name))
+                    except OSError:
+                        continue
+                    relative = os.path.relpath(os.path.join(root, name), directory)
+                    digest.update(f"{relative}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+        _docbuilder_version = f"files:{digest.hexdigest()[:16]}"
+    return _docbuilder_version
+
+
+class FormCache:
+    """Persistent SQLite cache of extracted form maps.
+
+    Documents are keyed by path, size and mtime, or by a hash of their
+    content, together with the docbuilder version. A changed file or a
+    docbuilder upgrade simply stops matching its old rows, which are then
+    evicted least recently used first once max_entries is exceeded.
+    """
+
+    FLUSH_EVERY = 100
+
+    def __init__(self, path, max_entries=100000, hash_content=False):
+        self.path = path
+        self.max_entries = max_entries
+        self.hash_content = hash_content
+        self.version = get_docbuilder_version()
+        self.hits = 0
+        self.misses = 0
+        self._pending = 0
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS forms ("
+            "doc_key TEXT, version TEXT, path TEXT, forms TEXT, accessed REAL, "
+            "PRIMARY KEY (doc_key, version))"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS forms_path ON forms (path)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS forms_accessed ON forms (accessed)")
+
+    def document_key(self, file_path) -> str:
+        if self.hash_content:
+            digest = hashlib.sha256()
+            with open(file_path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+            return f"sha256:{digest.hexdigest()}"
+        stat = os.stat(file_path)
+        return f"stat:{os.path.abspath(file_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+    def get(self, file_path):
+        try:
+            doc_key = self.document_key(file_path)
+        except OSError:
+            self.misses += 1
+            return None
+        row = self.connection.execute(
+            "SELECT forms FROM forms WHERE doc_key = ? AND version = ?", (doc_key, self.version)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.connection.execute(
+            "UPDATE forms SET accessed = ? WHERE doc_key = ? AND version = ?",
+            (time.time(), doc_key, self.version),
+        )
+        self._written()
+        return json.loads(row[0])
+
+    def put(self, file_path, form_map):
+        try:
+            doc_key = self.document_key(file_path)
+        except OSError:
+            return
+        path = os.path.abspath(file_path)
+        # an older extraction of the same path can never match again
+        self.connection.execute("DELETE FROM forms WHERE path = ? AND doc_key != ?", (path, doc_key))
+        self.connection.execute(
+            "INSERT OR REPLACE INTO forms VALUES (?, ?, ?, ?, ?)",
+            (doc_key, self.version, path, json.dumps(form_map), time.time()),
+        )
+        self._written()
+
+    def invalidate(self, file_path=None):
+        if file_path is None:
+            self.connection.execute("DELETE FROM forms")
+        else:
+            self.connection.execute("DELETE FROM forms WHERE path = ?", (os.path.abspath(file_path),))
+        self.connection.commit()
+
+    def evict(self):
+        count = self.connection.execute("SELECT COUNT(*) FROM forms").fetchone()[0]
+        if count > self.max_entries:
+            self.connection.execute(
+                "DELETE FROM forms WHERE rowid IN (SELECT rowid FROM forms ORDER BY accessed LIMIT ?)",
+                (count - self.max_entries,),
+            )
+        self.connection.commit()
+
+    def _written(self):
+        self._pending += 1
+        if self._pending >= self.FLUSH_EVERY:
+            self._pending = 0
+            self.evict()
+
+    def stats(self) -> Dict[str, int]:
+        entries = self.connection.execute("SELECT COUNT(*) FROM forms").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+    def close(self):
+        self.evict()
+        self.connection.close()
+
+
+class ResultStore:
+    """Result set of an incremental run, kept in SQLite between runs.
+
+    Every evaluated path is stored, with its record or NULL when it did not
+    pass, so that changed filters can re-evaluate every known document.
+    """
+
+    FLUSH_EVERY = 100
+
+    def __init__(self, path, signature, flush_every=FLUSH_EVERY):
+        self.signature = signature
+        self.flush_every = max(1, flush_every)
+        # called after every commit, with the writes it made durable
+        self.on_commit = None
+        self._pending = 0
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS results (path TEXT PRIMARY KEY, record TEXT)")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        row = self.connection.execute("SELECT value FROM meta WHERE name = 'signature'").fetchone()
+        # results written with other filters or output keys have to be recomputed
+        self.stale = row is not None and row[0] != signature
+
+    def paths(self) -> List[str]:
+        return [row[0] for row in self.connection.execute("SELECT path FROM results ORDER BY path")]
+
+    def put(self, file_path, record):
+        self.connection.execute(
+            "INSERT OR REPLACE INTO results VALUES (?, ?)",
+            (file_path, None if record is None else json.dumps(record)),
+        )
+        self._written()
+
+    def delete(self, file_path):
+        self.connection.execute("DELETE FROM results WHERE path = ?", (file_path,))
+        self._written()
+
+    def records(self) -> Iterator[Dict[str, Any]]:
+        rows = self.connection.execute("SELECT record FROM results WHERE record IS NOT NULL ORDER BY path")
+        for row in rows:
+            yield json.loads(row[0])
+
+    def _written(self):
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self.commit()
+
+    def commit(self):
+        self._pending = 0
+        self.connection.commit()
+        if self.on_commit is not None:
+            self.on_commit()
+
+    def close(self):
+        self.connection.execute(
+            "INSERT OR REPLACE INTO meta VALUES ('signature', ?)", (self.signature,)
+        )
+        self.commit()
+        self.connection.close()
+
+
+class ManifestUpdates:
+    """Rows for the DirectoryPath manifests the incoming paths came from.
+
+    DirectoryPath hands out a changed file together with the state it saw
+    and leaves recording it to the consumer. Updates are buffered and
+    written after the results they belong to are committed, so a run that
+    stops early gets its unprocessed changes again on the next scan.
+    """
+
+    def __init__(self):
+        self._updates = []
+        self._connections = {}
+
+    def add(self, item):
+        if not isinstance(item, Data) or not item.data.get("manifest"):
+            return
+        if item.data.get("deleted"):
+            self._updates.append((item.data["manifest"], "DELETE FROM files WHERE path = ?", (item.text,)))
+        else:
+            state = (item.text, item.data["size"], item.data["mtime_ns"], item.data["hash"])
+            self._updates.append((item.data["manifest"], "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)", state))
+
+    def __len__(self) -> int:
+        return len(self._updates)
+
+    def commit(self):
+        updates, self._updates = self._updates, []
+        touched = set()
+        for manifest, statement, parameters in updates:
+            if manifest not in self._connections:
+                self._connections[manifest] = sqlite3.connect(manifest, timeout=30)
+            self._connections[manifest].execute(statement, parameters)
+            touched.add(manifest)
+        # one short transaction per manifest, the scanner writes to it too
+        for manifest in touched:
+            self._connections[manifest].commit()
+
+    def close(self):
+        self.commit()
+        for connection in self._connections.values():
+            connection.close()
+        self._connections = {}
+
+
+# range operators of the predicates: Python/NumPy comparison and SQL operator
+COMPARISONS = {
+    "gt": (operator.gt, ">"),
+    "gte": (operator.ge, ">="),
+    "lt": (operator.lt, "<"),
+    "lte": (operator.le, "<="),
+}
+
+
+class FormIndex:
+    """Inverted index over the form values of a whole corpus, kept in SQLite.
+
+    Every document is extracted once. For each (key, tag) it gets a posting
+    holding the value getFormValueByKey returns, so text, checkbox and radio
+    filters become value -> documents lookups, and numeric (date) values go
+    to a separate sorted table answered with range scans. Postings with an
+    empty tag hold the untagged lookup of the key.
+    """
+
+    CHUNK = 500
+
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(
+            "CREATE TABLE IF NOT EXISTS docs (id INTEGER PRIMARY KEY, path TEXT UNIQUE, size INTEGER, mtime_ns INTEGER);"
+            "CREATE TABLE IF NOT EXISTS postings (key TEXT, tag TEXT, value TEXT, doc_id INTEGER);"
+            "CREATE TABLE IF NOT EXISTS numeric (key TEXT, tag TEXT, value REAL, doc_id INTEGER);"
+            "CREATE INDEX IF NOT EXISTS postings_value ON postings (key, tag, value);"
+            "CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc_id, key);"
+            "CREATE INDEX IF NOT EXISTS numeric_value ON numeric (key, tag, value);"
+            "CREATE INDEX IF NOT EXISTS numeric_doc ON numeric (doc_id);"
+        )
+
+    def is_current(self, file_path) -> bool:
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return False
+        row = self.connection.execute("SELECT size, mtime_ns FROM docs WHERE path = ?", (file_path,)).fetchone()
+        return row is not None and row[0] == stat.st_size and row[1] == stat.st_mtime_ns
+
+    def remove(self, file_path):
+        row = self.connection.execute("SELECT id FROM docs WHERE path = ?", (file_path,)).fetchone()
+        if row is None:
+            return
+        self.connection.execute("DELETE FROM postings WHERE doc_id = ?", row)
+        self.connection.execute("DELETE FROM numeric WHERE doc_id = ?", row)
+        self.connection.execute("DELETE FROM docs WHERE id = ?", row)
+
+    def add(self, file_path, file):
+        self.remove(file_path)
+        stat = os.stat(file_path)
+        doc_id = self.connection.execute(
+            "INSERT INTO docs (path, size, mtime_ns) VALUES (?, ?, ?)", (file_path, stat.st_size, stat.st_mtime_ns)
+        ).lastrowid
+        lookups = [(key, "") for key in file.key_index] + [(key, tag) for key, tag in file.index if tag]
+        for key, tag in lookups:
+            value = file.getFormValueByKey(key, tag)
+            self.connection.execute("INSERT INTO postings VALUES (?, ?, ?, ?)", (key, tag, json.dumps(value), doc_id))
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                self.connection.execute("INSERT INTO numeric VALUES (?, ?, ?, ?)", (key, tag, value, doc_id))
+
+    def build(self, file_paths, max_documents=100) -> int:
+        """Extract every document that is new or changed since it was indexed, return how many were."""
+        engines = EnginePool(max_documents)
+        extracted = 0
+        for file_path in file_paths:
+            if self.is_current(file_path):
+                continue
+            file = File()
+            if not file.open(file_path, pool=engines):
+                self.remove(file_path)
+                continue
+            with file:
+                self.add(file_path, file)
+            extracted += 1
+            if extracted % 100 == 0:
+                self.connection.commit()
+        self.connection.commit()
+        engines.close()
+        return extracted
+
+    def match(self, predicate) -> set:
+        key = predicate["key"]
+        tag = predicate.get("tag") or ""
+        op = predicate["op"]
+        operand = predicate.get("operand")
+        if op == "exists":
+            query, args = "SELECT doc_id FROM postings WHERE key = ? AND tag = ?", (key, tag)
+        elif op == "eq":
+            query, args = "SELECT doc_id FROM postings WHERE key = ? AND tag = ? AND value = ?", (key, tag, json.dumps(operand))
+        elif op in COMPARISONS:
+            if operand is None:
+                return set()
+            comparison = COMPARISONS[op][1]
+            query, args = f"SELECT doc_id FROM numeric WHERE key = ? AND tag = ? AND value {comparison} ?", (key, tag, operand)
+        else:
+            msg = f"Unknown predicate operator: {op}"
+            raise ValueError(msg)
+        return {row[0] for row in self.connection.execute(query, args)}
+
+    def query(self, predicates, output_keys, file_paths=None) -> List[Dict[str, Any]]:
+        """Records of the documents matching every predicate, without opening any of them."""
+        matched = None
+        for predicate in predicates:
+            ids = self.match(predicate)
+            matched = ids if matched is None else matched & ids
+            if not matched:
+                return []
+
+        docs = self.connection.execute("SELECT id, path FROM docs ORDER BY path").fetchall()
+        if file_paths is not None:
+            ids_by_path = {path: doc_id for doc_id, path in docs}
+            docs = [(ids_by_path[path], path) for path in file_paths if path in ids_by_path]
+        if matched is not None:
+            docs = [(doc_id, path) for doc_id, path in docs if doc_id in matched]
+
+        values = {}
+        if output_keys:
+            for start in range(0, len(docs), self.CHUNK):
+                chunk = [doc_id for doc_id, _ in docs[start : start + self.CHUNK]]
+                marks = ",".join("?" * len(chunk))
+                key_marks = ",".join("?" * len(output_keys))
+                rows = self.connection.execute(
+                    f"SELECT doc_id, key, value FROM postings WHERE tag = '' AND doc_id IN ({marks}) AND key IN ({key_marks})",
+                    (*chunk, *output_keys),
+                )
+                for doc_id, key, value in rows:
+                    values[(doc_id, key)] = json.loads(value)
+
+        records = []
+        for doc_id, path in docs:
+            record = {"file_path": path}
+            for key in output_keys or []:
+                record[key] = values.get((doc_id, key))
+            records.append(record)
+        return records
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
+
+
+def evaluate_predicate(file, predicate) -> bool:
+    key = predicate["key"]
+    tag = predicate.get("tag")
+    op = predicate["op"]
+    operand = predicate.get("operand")
+
+    if op == "exists":
+        return len(file.getFormsByKeyTag(key, tag)) > 0
+
+    value = file.getFormValueByKey(key, tag)
+    if op == "eq":
+        return value == operand
+    if op in COMPARISONS:
+        if value is None or operand is None:
+            return False
+        return COMPARISONS[op][0](value, operand)
+    msg = f"Unknown predicate operator: {op}"
+    raise ValueError(msg)
+
+
+def build_record(file, file_path, output_keys) -> Dict[str, Any]:
+    record = {"file_path": file_path}
+    if output_keys:
+        for key in output_keys:
+            record[key] = file.getFormValueByKey(key)
+    return record
+
+
+def evaluate_file(file, file_path, predicates, output_keys):
+    if all(evaluate_predicate(file, p) for p in predicates):
+        return build_record(file, file_path, output_keys)
+    return None
+
+
+# a field name: /T followed by a literal or hex string, or by an indirect reference
+PDF_FIELD_NAME = re.compile(rb"/T[\x00\t\n\x0c\r ]*(?:(\()|(<)(?!<)|(\d+[\x00\t\n\x0c\r ]+\d+[\x00\t\n\x0c\r ]+R))")
+PDF_ESCAPES = {ord("n"): b"\n", ord("r"): b"\r", ord("t"): b"\t", ord("b"): b"\b", ord("f"): b"\f"}
+MAX_FIELD_NAME = 4096
+
+
+def read_pdf_literal(data, start) -> bytes | None:
+    """Bytes of the literal string whose "(" is at start - 1, None if it does not end in time."""
+    out = bytearray()
+    depth = 1
+    i = start
+    end = min(len(data), start + MAX_FIELD_NAME)
+    while i < end:
+        c = data[i]
+        if c == 0x5C:  # backslash
+            i += 1
+            if i >= end:
+                return None
+            c = data[i]
+            if 0x30 <= c <= 0x37:
+                digits = 1
+                while digits < 3 and i + 1 < end and 0x30 <= data[i + 1] <= 0x37:
+                    i += 1
+                    digits += 1
+                out.append(int(data[i - digits + 1:i + 1], 8) & 0xFF)
+            elif c == 0x0D:
+                # a line continuation, \r\n counts as one end of line
+                if i + 1 < end and data[i + 1] == 0x0A:
+                    i += 1
+            elif c != 0x0A:
+                out += PDF_ESCAPES.get(c, bytes([c]))
+        elif c == 0x28:
+            depth += 1
+            out.append(c)
+        elif c == 0x29:
+            depth -= 1
+            if depth == 0:
+                return bytes(out)
+            out.append(c)
+        else:
+            out.append(c)
+        i += 1
+    return None
+
+
+def read_pdf_hex(data, start) -> bytes | None:
+    end = data.find(b">", start, start + 2 * MAX_FIELD_NAME)
+    if end < 0:
+        return None
+    digits = re.sub(rb"[\x00\t\n\x0c\r ]", b"", bytes(data[start:end]))
+    if len(digits) % 2:
+        digits += b"0"
+    try:
+        return bytes.fromhex(digits.decode("ascii"))
+    except ValueError:
+        return None
+
+
+def decode_pdf_text(raw) -> str | None:
+    """A PDF text string, None when its encoding leaves room for doubt."""
+    try:
+        if raw.startswith(b"\xfe\xff"):
+            return raw[2:].decode("utf-16-be")
+        if raw.startswith(b"\xef\xbb\xbf"):
+            return raw[3:].decode("utf-8")
+    except UnicodeDecodeError:
         return None
+    # PDFDocEncoding agrees with ASCII only on printable characters
+    if all(0x20 <= c < 0x7F for c in raw):
+        return raw.decode("ascii")
+    return None
+
+
+def pdf_field_names(data) -> set | None:
+    """Names of every form field in raw PDF bytes, None if they cannot all be read without parsing.
+
+    Compressed object streams and encryption hide the field dictionaries,
+    names given by reference or in an ambiguous encoding cannot be read;
+    all of those give None. A PDF without /AcroForm has no fields.
+    """
+    if data.find(b"/ObjStm") >= 0 or data.find(b"/Encrypt") >= 0:
+        return None
+    if data.find(b"/AcroForm") < 0:
+        return set()
+    names = set()
+    for match in PDF_FIELD_NAME.finditer(data):
+        if match.group(3):
+            return None
+        if match.group(1):
+            raw = read_pdf_literal(data, match.end())
+        else:
+            raw = read_pdf_hex(data, match.end())
+        name = decode_pdf_text(raw) if raw is not None else None
+        if name is None:
+            return None
+        names.add(name)
+    return names
+
+
+def required_keys(predicates) -> List[str]:
+    """Keys a document must have to pass: every predicate fails on a missing key but eq None."""
+    keys = []
+    for predicate in predicates:
+        if predicate["op"] != "eq" or predicate.get("operand") is not None:
+            keys.append(predicate["key"])
+    return list(dict.fromkeys(keys))
+
+
+class PreScreen:
+    """Rejects PDFs whose bytes show that a required key is missing, before any engine opens them.
+
+    Only definite answers reject a file: anything that is not a plain PDF
+    with readable field names is passed on to be opened.
+    """
+
+    def __init__(self, keys):
+        self.keys = list(keys)
+        self.rejected = 0
+
+    def may_match(self, file_path) -> bool:
+        try:
+            with open(file_path, "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return True
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    if data.find(b"%PDF-", 0, 1024) < 0:
+                        return True
+                    names = pdf_field_names(data)
+        except (OSError, ValueError):
+            return True
+        if names is None:
+            return True
+        for key in self.keys:
+            # a hierarchical field may be known by its full name, its parts carry one /T each
+            if key not in names and not all(part in names for part in key.split(".")):
+                self.rejected += 1
+                return False
+        return True
+
+
+class PredicatePlan:
+    """Wired filters compiled into one extraction pass and a vectorized evaluation.
+
+    Every document is reduced to a row holding the form count and value of
+    each (key, tag) the predicates need. Predicates are then evaluated over
+    batches of rows as NumPy boolean masks, so the cost grows with the
+    number of keys rather than with filters times lookups.
+    """
+
+    BATCH_SIZE = 1024
+
+    def __init__(self, predicates, batch_size=BATCH_SIZE):
+        self.predicates = predicates
+        self.batch_size = batch_size
+        self.columns = list(dict.fromkeys((p["key"], p.get("tag") or "") for p in predicates))
+        self.column_index = {column: i for i, column in enumerate(self.columns)}
+
+    def extract(self, file) -> list:
+        row = []
+        for key, tag in self.columns:
+            count = len(file.getEntries(key, tag))
+            row.append((count, file.getFormValueByKey(key, tag) if count else None))
+        return row
+
+    def evaluate(self, rows):
+        import numpy as np
+
+        mask = np.ones(len(rows), dtype=bool)
+        if not rows:
+            return mask
+        counts = np.array([[count for count, _ in row] for row in rows], dtype=np.int64)
+        values = {}
+        numbers = {}
+
+        for predicate in self.predicates:
+            if not mask.any():
+                break
+            column = self.column_index[(predicate["key"], predicate.get("tag") or "")]
+            op = predicate["op"]
+            operand = predicate.get("operand")
+
+            if op == "exists":
+                mask &= counts[:, column] > 0
+            elif op == "eq":
+                if column not in values:
+                    values[column] = np.array([row[column][1] for row in rows], dtype=object)
+                mask &= (values[column] == operand).astype(bool)
+            elif op in COMPARISONS:
+                if operand is None:
+                    mask[:] = False
+                    break
+                if column not in numbers:
+                    numbers[column] = np.array(
+                        [
+                            value if isinstance(value, (int, float)) and not isinstance(value, bool) else np.nan
+                            for _, value in (row[column] for row in rows)
+                        ],
+                        dtype=float,
+                    )
+                # NaN never compares true, so missing or non-numeric values fail
+                mask &= COMPARISONS[op][0](numbers[column], operand)
+            else:
+                msg = f"Unknown predicate operator: {op}"
+                raise ValueError(msg)
+        return mask
+
+    def select(self, rows, records) -> List:
+        """Records of the batch, None for the documents that did not pass."""
+        mask = self.evaluate(rows)
+        return [record if passed else None for record, passed in zip(records, mask)]
+
+
+class RecordTable(Sequence):
+    """Records of a run, stored column by column under one shared schema.
+
+    The columns are file_path and the output keys. Rows become dicts only
+    when they are read, so a large result holds one list per column
+    instead of one dict per document.
+    """
+
+    def __init__(self, columns):
+        self.columns = tuple(columns)
+        self._positions = {name: i for i, name in enumerate(self.columns)}
+        self._data = [[] for _ in self.columns]
+
+    @classmethod
+    def from_records(cls, records, output_keys=None):
+        table = cls(["file_path", *(output_keys or [])])
+        table.extend(records)
+        return table
+
+    def append(self, record):
+        for name, column in zip(self.columns, self._data):
+            column.append(record.get(name))
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def __len__(self) -> int:
+        return len(self._data[0])
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        return dict(zip(self.columns, [column[i] for column in self._data]))
+
+    def __iter__(self):
+        columns = self.columns
+        for values in zip(*self._data):
+            yield dict(zip(columns, values))
+
+    def __eq__(self, other):
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def discard(self, n):
+        """Drop the first n rows."""
+        for column in self._data:
+            del column[:n]
+
+    def column(self, name) -> List:
+        """The column itself, not a copy: callers must not modify it."""
+        return self._data[self._positions[name]]
+
+    def paths(self) -> List[str]:
+        return self.column("file_path")
+
+
+class RecordStream:
+    """Records handed out while the run is still going.
+
+    Every reader gets every record from the first one on, which lets the
+    Data and Paths outputs share a single streaming run. A record is kept
+    only until all readers have passed it, so memory follows how far the
+    slowest reader lags behind rather than the size of the result. Readers
+    have to exist before the first record is dropped, as the outputs do:
+    Langflow builds them all before anything downstream starts reading.
+    """
+
+    # readers that fall behind by at most this many records do not cause a copy on every record
+    TRIM_EVERY = 1024
+
+    def __init__(self, records, output_keys=None):
+        self._source = iter(records)
+        # records some reader still needs, kept as a table rather than as the dicts the run produced
+        self._buffer = RecordTable(["file_path", *(output_keys or [])])
+        # stream position of the first buffered record
+        self._offset = 0
+        # id(reader) -> position of the next record it reads
+        self._readers = {}
+        self._finished = False
+
+    def __iter__(self):
+        return RecordReader(self)
+
+    def _register(self, reader):
+        if self._offset:
+            msg = "The first records of the stream were already handed out and dropped, it cannot be read again."
+            raise RuntimeError(msg)
+        self._readers[id(reader)] = 0
+
+    def _unregister(self, reader):
+        self._readers.pop(id(reader), None)
+        self._trim()
+
+    def _read(self, reader, position):
+        while position >= self._offset + len(self._buffer):
+            if self._finished:
+                raise StopIteration
+            try:
+                record = next(self._source)
+            except StopIteration:
+                self._finished = True
+                raise
+            self._buffer.append(record)
+        record = self._buffer[position - self._offset]
+        self._readers[id(reader)] = position + 1
+        self._trim()
+        return record
+
+    def drain(self):
+        """Run the source to its end without reading, readers still get every record they have not read."""
+        for record in self._source:
+            self._buffer.append(record)
+        self._finished = True
+
+    def _trim(self):
+        if not self._readers:
+            return
+        done = min(self._readers.values()) - self._offset
+        # dropping from the front copies the rest, so wait until it is cheap relative to the buffer
+        if done >= self.TRIM_EVERY or (done and done * 2 >= len(self._buffer)):
+            self._buffer.discard(done)
+            self._offset += done
+
+
+class RecordReader:
+    """One reader of a RecordStream, registered as soon as it is created."""
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._position = 0
+        stream._register(self)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._stream is None:
+            raise StopIteration
+        try:
+            record = self._stream._read(self, self._position)
+        except StopIteration:
+            self.close()
+            raise
+        self._position += 1
+        return record
+
+    def close(self):
+        if self._stream is not None:
+            self._stream._unregister(self)
+            self._stream = None
 
     def __del__(self):
         self.close()
 
 
+class FilterStats:
+    """Pass rate and cost of one filter, used to order filters."""
+
+    __slots__ = ("calls", "passed", "seconds")
+
+    def __init__(self):
+        self.calls = 0
+        self.passed = 0
+        self.seconds = 0.0
+
+    def add(self, passed, seconds):
+        self.calls += 1
+        self.passed += int(bool(passed))
+        self.seconds += seconds
+
+    @property
+    def pass_rate(self) -> float:
+        return self.passed / self.calls if self.calls else 1.0
+
+    @property
+    def cost(self) -> float:
+        return self.seconds / self.calls if self.calls else 0.0
+
+    def rank(self) -> float:
+        # cheap filters that reject many documents go first: cost / (1 - pass rate)
+        rejected = 1.0 - self.pass_rate
+        return self.cost / rejected if rejected > 0 else float("inf")
+
+
+class FilterStatsCache:
+    """Filter settings -> FilterStats learned over earlier runs, least recently used settings forgotten first."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._stats = OrderedDict()
+
+    def get(self, key) -> FilterStats:
+        stats = self._stats.pop(key, None)
+        if stats is None:
+            stats = FilterStats()
+        self._stats[key] = stats
+        while len(self._stats) > self.max_entries:
+            self._stats.popitem(last=False)
+        return stats
+
+    def __len__(self) -> int:
+        return len(self._stats)
+
+
+# kept for as long as the component code is loaded
+FILTER_STATS = FilterStatsCache()
+
+
+class RunMetrics:
+    """Stage timers, counters and the slowest documents of one run."""
+
+    enabled = True
+
+    def __init__(self, slowest=10):
+        self.slowest = slowest
+        # stage -> [count, seconds]
+        self.stages: Dict[str, List] = {}
+        self.counters: Dict[str, int] = {}
+        # min-heap of (seconds, file_path, bridge_calls), holds the slowest documents
+        self.documents = []
+        self.skipped_paths = []
+
+    def clock(self) -> float:
+        return time.perf_counter()
+
+    def since(self, stage, start) -> float:
+        """Add the time from start to now to stage and return now."""
+        now = time.perf_counter()
+        self.time(stage, now - start)
+        return now
+
+    def time(self, stage, seconds):
+        timer = self.stages.get(stage)
+        if timer is None:
+            timer = self.stages[stage] = [0, 0.0]
+        timer[0] += 1
+        timer[1] += seconds
+
+    def count(self, counter, n=1):
+        self.counters[counter] = self.counters.get(counter, 0) + n
+
+    def document(self, file_path, seconds, bridge_calls=0):
+        self.count("documents")
+        self.count("bridge_calls", bridge_calls)
+        item = (seconds, file_path, bridge_calls)
+        if len(self.documents) < self.slowest:
+            heapq.heappush(self.documents, item)
+        elif self.slowest > 0 and item > self.documents[0]:
+            heapq.heapreplace(self.documents, item)
+
+    def skipped(self, file_path):
+        self.count("skipped_open")
+        self.skipped_paths.append(file_path)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "stages": {
+                stage: {"count": count, "seconds": seconds, "avg_ms": seconds / count * 1000}
+                for stage, (count, seconds) in self.stages.items()
+            },
+            "counters": dict(self.counters),
+            "skipped": list(self.skipped_paths),
+            "slowest": [
+                {"file_path": file_path, "ms": seconds * 1000, "bridge_calls": bridge_calls}
+                for seconds, file_path, bridge_calls in sorted(self.documents, reverse=True)
+            ],
+        }
+
+    def to_prometheus(self) -> str:
+        # the samples of a metric family form one group after its TYPE line
+        stages = sorted(self.stages.items())
+        lines = ["# TYPE form_filter_stage_seconds_total counter"]
+        for stage, (_, seconds) in stages:
+            lines.append(f"form_filter_stage_seconds_total{{stage={json.dumps(stage)}}} {seconds}")
+        lines.append("# TYPE form_filter_stage_calls_total counter")
+        for stage, (count, _) in stages:
+            lines.append(f"form_filter_stage_calls_total{{stage={json.dumps(stage)}}} {count}")
+        for counter, value in sorted(self.counters.items()):
+            lines.append(f"# TYPE form_filter_{counter}_total counter")
+            lines.append(f"form_filter_{counter}_total {value}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, sink):
+        """Prometheus text for a .prom file, otherwise one JSON line appended per run."""
+        if sink.endswith(".prom"):
+            # written whole and renamed so a node exporter never reads half a file
+            tmp = sink + ".tmp"
+            with open(tmp, "w") as f:
+                f.write(self.to_prometheus())
+            os.replace(tmp, sink)
+        else:
+            with open(sink, "a") as f:
+                f.write(json.dumps(dict(self.to_dict(), time=time.time())) + "\n")
+
+
+class NullMetrics:
+    """Stands in for RunMetrics when metrics are off, callers check `enabled` before timing."""
+
+    enabled = False
+
+    def clock(self) -> float:
+        return 0.0
+
+    def since(self, stage, start) -> float:
+        return 0.0
+
+    def time(self, stage, seconds):
+        pass
+
+    def count(self, counter, n=1):
+        pass
+
+    def document(self, file_path, seconds, bridge_calls=0):
+        pass
+
+    def skipped(self, file_path):
+        pass
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {}
+
+
+NULL_METRICS = NullMetrics()
+
+
+def _resident_bytes(pid):
+    """Resident set size of a process, None where /proc is not available."""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _worker_main(conn, predicates, output_keys, max_documents, with_form_map, keys):
+    """Worker loop: engines live in the worker and are reused between documents."""
+    engines = EnginePool(max_documents)
+    while True:
+        task = conn.recv()
+        if task is None:
+            break
+        index, file_path = task
+        start = time.perf_counter()
+        try:
+            file = File()
+            if not file.open(file_path, pool=engines, keys=keys):
+                conn.send((index, "skipped", None, None, None))
+                continue
+            # a failed document sends its engine to recycling
+            with file:
+                record = evaluate_file(file, file_path, predicates, output_keys)
+                form_map = file.getFormMap() if with_form_map else None
+            conn.send((index, "ok", record, form_map, (time.perf_counter() - start, file.bridge_calls)))
+        except MemoryError:
+            # the engine may be left half-allocated, the parent replaces this worker
+            conn.send((index, "fatal", "out of memory", None, None))
+            break
+        except Exception as e:
+            conn.send((index, "error", repr(e), None, None))
+    engines.close()
+    conn.close()
+
+
+class FormWorkerPool:
+    """Spreads documents over worker processes and yields results in input order.
+
+    Workers are forked, so filters travel as plain predicate dicts and records
+    come back as plain dicts. A worker that dies, runs past `timeout` seconds
+    on a document or hits `memory_limit` bytes takes only its current
+    document with it; it is replaced and the batch goes on.
+
+    The memory limit is checked against each worker's resident set, polled
+    every MEMORY_POLL_S seconds while it works: engines reserve far more
+    address space than they touch, so an address-space cap fails documents
+    that would fit.
+    """
+
+    MEMORY_POLL_S = 0.1
+
+    def __init__(
+        self,
+        workers,
+        predicates,
+        output_keys,
+        max_documents=100,
+        cache=None,
+        keys=None,
+        metrics=NULL_METRICS,
+        timeout=None,
+        memory_limit=None,
+    ):
+        self.workers = workers
+        self.predicates = predicates
+        self.output_keys = output_keys
+        self.max_documents = max_documents
+        # the cache stays in this process, workers only send back what they extracted
+        self.cache = cache
+        self.keys = keys
+        # only per-document times reach the parent, stage timers stay in the workers
+        self.metrics = metrics
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        # multiprocessing is imported only by runs that use workers
+        import multiprocessing
+
+        self.ctx = multiprocessing.get_context("fork")
+        # {"file_path", "reason"} of every document that produced no result
+        self.failed = []
+
+    def _spawn(self):
+        parent_conn, child_conn = self.ctx.Pipe()
+        process = self.ctx.Process(
+            target=_worker_main,
+            args=(
+                child_conn,
+                self.predicates,
+                self.output_keys,
+                self.max_documents,
+                self.cache is not None,
+                self.keys,
+            ),
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        return {"process": process, "conn": parent_conn, "task": None, "deadline": None}
+
+    def _fail(self, file_path, reason):
+        self.failed.append({"file_path": file_path, "reason": reason})
+        self.metrics.count("failed")
+
+    def _kill(self, worker):
+        worker["process"].kill()
+        worker["process"].join(timeout=5)
+        worker["conn"].close()
+
+    def _over_memory(self, worker):
+        if not self.memory_limit:
+            return False
+        resident = _resident_bytes(worker["process"].pid)
+        return resident is not None and resident > self.memory_limit
+
+    def _stop(self, worker):
+        try:
+            worker["conn"].send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        worker["process"].join(timeout=5)
+        if worker["process"].is_alive():
+            worker["process"].kill()
+        worker["conn"].close()
+
+    def map(self, file_paths):
+        """Yield (file_path, record) for every document, record is None if it did not pass.
+
+        file_paths may be a lazy iterable: paths are pulled only when a
+        worker is free to take them.
+        """
+        from multiprocessing.connection import wait
+
+        source = enumerate(file_paths)
+        exhausted = False
+        paths = {}
+        done = {}
+        next_index = 0
+        pool = []
+
+        try:
+            while True:
+                while not exhausted and (len(pool) < self.workers or any(w["task"] is None for w in pool)):
+                    try:
+                        index, file_path = next(source)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    paths[index] = file_path
+                    form_map = self.cache.get(file_path) if self.cache is not None else None
+                    if form_map is not None:
+                        file = File.fromFormMap(form_map)
+                        done[index] = evaluate_file(file, file_path, self.predicates, self.output_keys)
+                        self.metrics.count("cache_hits")
+                        continue
+                    worker = next((w for w in pool if w["task"] is None), None)
+                    if worker is None:
+                        worker = self._spawn()
+                        pool.append(worker)
+                    worker["task"] = (index, file_path)
+                    if self.timeout:
+                        worker["deadline"] = time.monotonic() + self.timeout
+                    worker["conn"].send(worker["task"])
+
+                while next_index in done:
+                    yield paths.pop(next_index), done.pop(next_index)
+                    next_index += 1
+
+                busy = [w for w in pool if w["task"] is not None]
+                if not busy:
+                    if exhausted:
+                        break
+                    continue
+                deadlines = [w["deadline"] for w in busy if w["deadline"] is not None]
+                timeout = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+                if self.memory_limit:
+                    timeout = self.MEMORY_POLL_S if timeout is None else min(timeout, self.MEMORY_POLL_S)
+                ready = wait([w["conn"] for w in busy] + [w["process"].sentinel for w in busy], timeout)
+
+                for i, worker in enumerate(pool):
+                    if worker["task"] is None:
+                        continue
+                    index, file_path = worker["task"]
+                    message = None
+                    if worker["conn"].poll():
+                        try:
+                            message = worker["conn"].recv()
+                        except EOFError:
+                            pass
+                    if message is not None:
+                        _, status, payload, form_map, timing = message
+                        if status in ("error", "fatal"):
+                            self._fail(file_path, payload)
+                        elif status == "skipped":
+                            self.failed.append({"file_path": file_path, "reason": "could not be opened"})
+                            self.metrics.skipped(file_path)
+                        else:
+                            self.metrics.document(file_path, *timing)
+                        if form_map is not None:
+                            self.cache.put(file_path, form_map)
+                        done[index] = payload if status == "ok" else None
+                        worker["task"] = None
+                        worker["deadline"] = None
+                        if status == "fatal":
+                            self._stop(worker)
+                            pool[i] = self._spawn()
+                    elif worker["conn"] in ready or worker["process"].sentinel in ready:
+                        worker["process"].join(timeout=5)
+                        self._fail(file_path, f"worker exited with code {worker['process'].exitcode}")
+                        done[index] = None
+                        worker["conn"].close()
+                        pool[i] = self._spawn()
+                    elif self._over_memory(worker):
+                        self._kill(worker)
+                        self._fail(file_path, f"memory limit of {self.memory_limit // (1024 * 1024)} MB exceeded")
+                        done[index] = None
+                        pool[i] = self._spawn()
+                    elif worker["deadline"] is not None and time.monotonic() >= worker["deadline"]:
+                        # a hung open never answers, the only way out is to kill the worker
+                        self._kill(worker)
+                        self._fail(file_path, f"timed out after {self.timeout:g} s")
+                        done[index] = None
+                        pool[i] = self._spawn()
+
+                while next_index in done:
+                    yield paths.pop(next_index), done.pop(next_index)
+                    next_index += 1
+        finally:
+            for worker in pool:
+                self._stop(worker)
+
+
+def assign_shards(file_paths, shards, strategy="hash") -> List[List[int]]:
+    """Split input positions into shards, the same way for the same paths on every host.
+
+    "hash" places a path by a hash of its name, "size" balances the bytes
+    per shard: largest files first, each to the lightest shard so far.
+    """
+    assignment = [[] for _ in range(shards)]
+    if strategy == "size":
+        sizes = []
+        for index, file_path in enumerate(file_paths):
+            try:
+                size = os.path.getsize(file_path)
+            except OSError:
+                size = 0
+            sizes.append((-size, index))
+        loads = [(0, shard) for shard in range(shards)]
+        for negative_size, index in sorted(sizes):
+            load, shard = heapq.heappop(loads)
+            assignment[shard].append(index)
+            heapq.heappush(loads, (load - negative_size, shard))
+        for indexes in assignment:
+            indexes.sort()
+    else:
+        for index, file_path in enumerate(file_paths):
+            digest = hashlib.sha1(file_path.encode("utf-8", "surrogateescape")).digest()
+            assignment[int.from_bytes(digest[:8], "big") % shards].append(index)
+    return assignment
+
+
+class ShardedRun:
+    """A run split into shards that write partial results into one shared directory.
+
+    plan.json describes the whole run. Shard n writes shard-n.jsonl, one
+    line per document in input order, and then shard-n.done. While a run is
+    incomplete a shard with a marker is not run again for the same plan, so
+    after a failure only the missing shards are redone. A plan covers the
+    size and mtime of every document and is removed with its shard files
+    once merged, so a later run never reuses stale results. Shards run as
+    local processes or as `python form_filter.py shard DIR N` on any host
+    that sees DIR.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def path(self, name) -> str:
+        return os.path.join(self.directory, name)
+
+    def output(self, shard) -> str:
+        return self.path(f"shard-{shard:04d}.jsonl")
+
+    def marker(self, shard) -> str:
+        return self.path(f"shard-{shard:04d}.done")
+
+    def load_plan(self) -> Dict[str, Any] | None:
+        try:
+            with open(self.path("plan.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def prepare(self, file_paths, shards, strategy, predicates, output_keys, keys=None, max_documents=100) -> Dict[str, Any]:
+        """Write the plan, keeping finished shards when it retries an incomplete run of the same documents."""
+        file_paths = list(file_paths)
+        stats = []
+        for file_path in file_paths:
+            try:
+                stat = os.stat(file_path)
+                stats.append([stat.st_size, stat.st_mtime_ns])
+            except OSError:
+                stats.append(None)
+        plan = {
+            "file_paths": file_paths,
+            "stats": stats,
+            "strategy": strategy,
+            "predicates": predicates,
+            "output_keys": list(output_keys or []),
+            "keys": keys,
+            "max_documents": max_documents,
+        }
+        plan["signature"] = hashlib.sha1(json.dumps([plan, shards], sort_keys=True).encode()).hexdigest()
+        previous = self.load_plan()
+        if previous is not None and previous["signature"] == plan["signature"]:
+            return previous
+
+        os.makedirs(self.directory, exist_ok=True)
+        self.clear()
+        plan["shards"] = assign_shards(plan["file_paths"], shards, strategy)
+        tmp = self.path("plan.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(plan, f)
+        os.replace(tmp, self.path("plan.json"))
+        return plan
+
+    def clear(self):
+        """Remove the plan and the shard files."""
+        for name in os.listdir(self.directory):
+            if name.startswith("shard-") or name == "plan.json":
+                os.remove(self.path(name))
+
+    def pending(self, plan) -> List[int]:
+        return [shard for shard in range(len(plan["shards"])) if not os.path.exists(self.marker(shard))]
+
+    def run(self, shard):
+        """Evaluate one shard in this process."""
+        plan = self.load_plan()
+        file_paths = plan["file_paths"]
+        engines = EnginePool(plan["max_documents"])
+        tmp = self.output(shard) + ".tmp"
+        try:
+            with open(tmp, "w") as f:
+                for index in plan["shards"][shard]:
+                    file_path = file_paths[index]
+                    line = {"index": index, "file_path": file_path, "record": None}
+                    try:
+                        file = File()
+                        if file.open(file_path, pool=engines, keys=plan["keys"]):
+                            with file:
+                                line["record"] = evaluate_file(file, file_path, plan["predicates"], plan["output_keys"])
+                        else:
+                            line["error"] = "could not be opened"
+                    except Exception as e:
+                        line["error"] = repr(e)
+                    f.write(json.dumps(line) + "\n")
+            os.replace(tmp, self.output(shard))
+        finally:
+            engines.close()
+        with open(self.marker(shard), "w") as f:
+            f.write(plan["signature"])
+
+    def run_local(self, shards, retries=1) -> List[int]:
+        """Run shards as local processes standing in for nodes, return the ones that still failed."""
+        import multiprocessing
+
+        ctx = multiprocessing.get_context("fork")
+        for _ in range(retries + 1):
+            processes = [(shard, ctx.Process(target=self.run, args=(shard,), daemon=True)) for shard in shards]
+            for _, process in processes:
+                process.start()
+            for _, process in processes:
+                process.join()
+            shards = [shard for shard in shards if not os.path.exists(self.marker(shard))]
+            if not shards:
+                break
+        return shards
+
+    def merge(self, plan) -> Iterator[Dict[str, Any]]:
+        """Lines of every shard in input order; shard files are each in input order already.
+
+        The run is cleared once every line has been read, only an incomplete
+        run keeps its finished shards.
+        """
+        files = [open(self.output(shard)) for shard in range(len(plan["shards"]))]
+        try:
+            yield from heapq.merge(*((json.loads(line) for line in f) for f in files), key=lambda line: line["index"])
+        finally:
+            for f in files:
+                f.close()
+        self.clear()
+
+
+class ExtractionServer:
+    """Keeps docbuilder engines warm and answers form maps over a Unix socket.
+
+    The protocol is one JSON object per line: the client sends
+    {"file_path": ..., "keys": [...] or null} and gets back
+    {"form_map": [...]} or {"form_map": null, "error": ...}. Documents are
+    extracted one at a time, connections may stay open between requests.
+    """
+
+    def __init__(self, socket_path, max_documents=100):
+        import socketserver
+        import threading
+
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        self.socket_path = socket_path
+        self.engines = EnginePool(max_documents)
+        # engines are not shared between threads, requests take turns
+        self.lock = threading.Lock()
+        # start one engine before the first request arrives
+        self.engines.release(self.engines.acquire())
+
+        extract = self.extract
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    try:
+                        request = json.loads(line)
+                        response = extract(request["file_path"], request.get("keys"))
+                    except (ValueError, KeyError, TypeError) as e:
+                        response = {"form_map": None, "error": f"bad request: {e!r}"}
+                    try:
+                        self.wfile.write(json.dumps(response).encode() + b"\n")
+                        self.wfile.flush()
+                    except OSError:
+                        # the client gave up on this request and reconnected
+                        return
+
+        self.server = socketserver.ThreadingUnixStreamServer(socket_path, Handler)
+        self.server.daemon_threads = True
+        os.chmod(socket_path, 0o600)
+
+    def extract(self, file_path, keys=None) -> Dict[str, Any]:
+        with self.lock:
+            try:
+                file = File()
+                if not file.open(file_path, pool=self.engines, keys=keys):
+                    return {"form_map": None, "error": "could not be opened"}
+                with file:
+                    return {"form_map": file.getFormMap()}
+            except Exception as e:
+                return {"form_map": None, "error": repr(e)}
+
+    def serve_forever(self):
+        self.server.serve_forever()
+
+    def server_close(self):
+        self.server.server_close()
+        self.engines.close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+class ExtractionClient:
+    """Connection to an ExtractionServer, used in place of an in-process engine."""
+
+    def __init__(self, socket_path, timeout=None):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.socket = None
+        self.reader = None
+        self.connect()
+
+    def connect(self):
+        import socket
+
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.settimeout(self.timeout)
+        self.socket.connect(self.socket_path)
+        self.reader = self.socket.makefile("rb")
+
+    def reconnect(self):
+        """Start on a new connection: a late reply on the old one would be read as the answer to the next request."""
+        self.close()
+        self.connect()
+
+    def extract(self, file_path, keys=None) -> Dict[str, Any]:
+        request = {"file_path": file_path, "keys": None if keys is None else list(keys)}
+        self.socket.sendall(json.dumps(request).encode() + b"\n")
+        line = self.reader.readline()
+        if not line:
+            msg = "The extraction daemon closed the connection."
+            raise ConnectionError(msg)
+        return json.loads(line)
+
+    def close(self):
+        if self.reader is not None:
+            self.reader.close()
+            self.socket.close()
+        self.reader = None
+        self.socket = None
+
+
 class FormFilterComponent(Component):
     display_name: str = "Form Filter"
     description: str = "Filters the specified forms based on the specified criteria."
@@ -155,48 +1958,749 @@ class FormFilterComponent(Component):
             input_types=["Data"],
             value=None,
         ),        
+        IntInput(
+            name="workers",
+            display_name="Workers",
+            info="Number of worker processes that open documents in parallel. 1 processes them in this process.",
+            value=1,
+            advanced=True,
+        ),
+        IntInput(
+            name="engine_max_documents",
+            display_name="Documents Per Engine",
+            info="Number of documents a docbuilder engine opens before it is replaced with a fresh one.",
+            value=100,
+            advanced=True,
+        ),
+        FloatInput(
+            name="document_timeout",
+            display_name="Document Timeout",
+            info="Seconds a document may take before its worker is killed and the document is reported as failed. 0 disables the limit.",
+            value=0.0,
+            advanced=True,
+        ),
+        IntInput(
+            name="document_memory_mb",
+            display_name="Worker Memory Limit (MB)",
+            info="Resident memory a worker may use before it is killed and the document it is processing is reported as failed. 0 disables the limit.",
+            value=0,
+            advanced=True,
+        ),
+        MessageTextInput(
+            name="cache_path",
+            display_name="Cache Path",
+            info="SQLite file that keeps extracted forms between runs. Unchanged documents are not reopened. Leave empty to disable.",
+            value="",
+            advanced=True,
+        ),
+        IntInput(
+            name="cache_max_entries",
+            display_name="Cache Size",
+            info="Maximum number of documents kept in the cache.",
+            value=100000,
+            advanced=True,
+        ),
+        BoolInput(
+            name="cache_hash_content",
+            display_name="Hash File Contents",
+            info="Identify cached documents by a hash of their content instead of path, size and modification time.",
+            value=False,
+            advanced=True,
+        ),
+        BoolInput(
+            name="prescreen",
+            display_name="Pre-screen PDFs",
+            info="Read the raw bytes of each PDF first and skip it without opening when a key the filters require is not among its field names. PDFs whose field names cannot be read that way are opened as usual.",
+            value=False,
+            advanced=True,
+        ),
+        BoolInput(
+            name="vectorized_filters",
+            display_name="Vectorized Filters",
+            info="Compile the filters into one plan: each document is read once and filters are evaluated in bulk with NumPy.",
+            value=False,
+            advanced=True,
+        ),
+        BoolInput(
+            name="project_keys",
+            display_name="Load Only Needed Keys",
+            info="Fetch only the forms whose keys the filters and output keys use instead of every form of the document. Ignored while the cache is enabled.",
+            value=False,
+            advanced=True,
+        ),
+        MessageTextInput(
+            name="results_path",
+            display_name="Result Store",
+            info="SQLite file holding the result set between runs. Only the paths received in a run are evaluated and merged into it; paths marked as deleted are dropped. With a watched directory the stored set is followed by each record as the watch refreshes it. Leave empty to disable.",
+            value="",
+            advanced=True,
+        ),
+        MessageTextInput(
+            name="index_path",
+            display_name="Form Index",
+            info="SQLite file holding an inverted index of the form values of the whole corpus.",
+            value="",
+            advanced=True,
+        ),
+        DropdownInput(
+            name="index_mode",
+            display_name="Index Mode",
+            info="Build: index new or changed documents, then answer from the index. Query: answer from the index only, no document is opened.",
+            options=["Off", "Build", "Query"],
+            value="Off",
+            advanced=True,
+        ),
+        BoolInput(
+            name="stream",
+            display_name="Stream Results",
+            info="Hand records downstream as documents pass instead of after the whole folder is processed. With a result store the stored set is streamed once the run is merged. Always on for a watched directory.",
+            value=False,
+            advanced=True,
+        ),
+        BoolInput(
+            name="collect_metrics",
+            display_name="Collect Metrics",
+            info="Time every stage and filter, count engine calls per document and keep the slowest documents.",
+            value=False,
+            advanced=True,
+        ),
+        IntInput(
+            name="metrics_slowest",
+            display_name="Slowest Documents",
+            info="Number of slowest documents listed in the metrics.",
+            value=10,
+            advanced=True,
+        ),
+        MessageTextInput(
+            name="metrics_sink",
+            display_name="Metrics File",
+            info="File the metrics of each run are written to: Prometheus text for a .prom file, otherwise a JSON line appended per run. Leave empty to disable.",
+            value="",
+            advanced=True,
+        ),
+        MessageTextInput(
+            name="daemon_socket",
+            display_name="Extraction Daemon",
+            info="Unix socket of a daemon started with `python form_filter.py serve <socket>`. Documents are read by its warm engines instead of engines started for this run. Leave empty to disable.",
+            value="",
+            advanced=True,
+        ),
+        IntInput(
+            name="shards",
+            display_name="Shards",
+            info="Split the paths into this many shards, each evaluated in its own process or host and merged in input order. 1 disables sharding.",
+            value=1,
+            advanced=True,
+        ),
+        DropdownInput(
+            name="shard_strategy",
+            display_name="Shard By",
+            info="Path Hash: a path always lands in the same shard. Byte Size: shards get about the same number of bytes.",
+            options=["Path Hash", "Byte Size"],
+            value="Path Hash",
+            advanced=True,
+        ),
+        MessageTextInput(
+            name="shard_dir",
+            display_name="Shard Directory",
+            info="Directory every node can reach, holding the plan and the partial result of each shard.",
+            value="",
+            advanced=True,
+        ),
+        DropdownInput(
+            name="shard_nodes",
+            display_name="Shard Nodes",
+            info="Local Processes: run unfinished shards here, one process each. External: shards are started on other hosts with `python form_filter.py shard <dir> <n>`; the flow merges once all are done.",
+            options=["Local Processes", "External"],
+            value="Local Processes",
+            advanced=True,
+        ),
+        IntInput(
+            name="shard_retries",
+            display_name="Shard Retries",
+            info="Times a failed local shard is run again before the run fails. A later run redoes only the shards still missing.",
+            value=1,
+            advanced=True,
+        ),
+        BoolInput(
+            name="track_leaks",
+            display_name="Track Engine Leaks",
+            info="Debug mode: record where every document and engine was opened and list the ones still open in the metrics.",
+            value=False,
+            advanced=True,
+        ),
     ]
 
     outputs = [
         Output(display_name="Data", name="data_list", method="build_data"),
         Output(display_name="Paths", name="paths_list", method="build_paths"),
+        Output(display_name="Filter Stats", name="filter_stats", method="build_filter_stats"),
+        Output(display_name="Metrics", name="metrics", method="build_metrics"),
+        Output(display_name="Failed", name="failed_list", method="build_failed"),
     ]
 
-    def build_main(self) -> List:
-        file_paths: list[str] = self.paths
+    # documents evaluated against every filter before filters are reordered
+    FILTER_WARMUP = 32
+    FILTER_REORDER_EVERY = 256
+
+    def _filter_signature(self, filter_component) -> tuple:
+        attributes = getattr(filter_component, "_attributes", None) or {}
+        values = tuple(sorted((name, repr(value)) for name, value in attributes.items()))
+        return (type(filter_component).__name__, id(filter_component), values)
+
+    def _filter_stats_key(self, filter_component) -> tuple:
+        name, _, values = self._filter_signature(filter_component)
+        return (name, values)
+
+    def _filter_key(self, filter_component):
+        attributes = getattr(filter_component, "_attributes", None) or {}
+        return attributes.get("key", attributes.get("field_1_name"))
+
+    def _filter_label(self, filter_component) -> str:
+        name = getattr(filter_component, "display_name", type(filter_component).__name__)
+        key = self._filter_key(filter_component)
+        return f"{name}({key})" if key else name
+
+    def iter_paths(self) -> Iterator[str | Data]:
+        """The incoming paths, with streamed ones flattened in.
+
+        A streaming DirectoryPath returns a generator, which Langflow hands
+        to this list input either as is or as the single element of a list.
+        Of a watched directory only the scan is read, see get_watch.
+        """
+        paths = self.paths if isinstance(self.paths, (list, tuple)) else [self.paths]
+        for item in paths:
+            if isinstance(item, (str, Data)):
+                yield item
+            elif getattr(item, "endless", False):
+                yield from item.scan
+            else:
+                yield from item
+
+    def get_watch(self):
+        """The stream of a watched directory among the paths, None when the paths come to an end."""
+        paths = self.paths if isinstance(self.paths, (list, tuple)) else [self.paths]
+        for item in paths:
+            if getattr(item, "endless", False):
+                return item
+        return None
+
+    def _results_cache_key(self) -> tuple:
+        paths = self.paths if isinstance(self.paths, (list, tuple)) else [self.paths]
+        if all(isinstance(p, (str, Data)) for p in paths):
+            file_paths = tuple(file_path.text if isinstance(file_path, Data) else file_path for file_path in paths)
+        else:
+            # paths streamed from a scanner can be consumed only once
+            file_paths = ("stream", *(id(p) for p in paths))
+        filters = tuple(self._filter_signature(f) for f in self.fields)
+        output_keys = tuple(self.output_keys.data["output_keys"]) if self.output_keys else ()
+        return (file_paths, filters, output_keys)
+
+    def get_results(self) -> RecordTable | RecordStream | List[Dict[str, Any]]:
+        """Run build_main once per set of inputs and share the records between outputs.
+
+        The table becomes a list of dicts once the Data output has converted it.
+        """
+        cache_key = self._results_cache_key()
+        cache = getattr(self, "_results_cache", None)
+        if cache is None or cache[0] != cache_key:
+            # a watched directory never ends, its records can only be streamed
+            if getattr(self, "stream", False) or self.get_watch() is not None:
+                output_keys = self.output_keys.data["output_keys"] if self.output_keys else None
+                cache = (cache_key, RecordStream(self.iter_records(), output_keys))
+            else:
+                cache = (cache_key, self.build_main())
+            self._results_cache = cache
+        return cache[1]
+
+    def get_predicates(self, filters) -> List | None:
+        """Serializable form of the wired filters, None if one of them cannot provide it."""
+        predicates = []
+        for filter_component in filters:
+            if not hasattr(filter_component, "process"):
+                continue
+            if not hasattr(filter_component, "get_predicates"):
+                return None
+            filter_predicates = filter_component.get_predicates()
+            if filter_predicates is None:
+                return None
+            predicates.extend(filter_predicates)
+        return predicates
+
+    def build_main(self) -> RecordTable:
+        output_keys = self.output_keys.data["output_keys"] if self.output_keys else None
+        return RecordTable.from_records(self.iter_records(), output_keys)
+
+    def complete_run(self):
+        """Make sure the run behind the outputs has finished, or report a watch as it is so far."""
+        results = self.get_results()
+        if isinstance(results, RecordStream) and self.get_watch() is None:
+            results.drain()
+
+    def _results_signature(self) -> str:
+        filters = [self._filter_stats_key(f) for f in self.fields if hasattr(f, "process")]
+        output_keys = self.output_keys.data["output_keys"] if self.output_keys else []
+        return repr((filters, list(output_keys)))
+
+    def iter_index_records(self, build) -> Iterator[Dict[str, Any]]:
+        predicates = self.get_predicates(self.fields)
+        if predicates is None:
+            msg = "Every filter must describe itself as predicates to be answered from the form index."
+            raise ValueError(msg)
+        output_keys = self.output_keys.data["output_keys"] if self.output_keys else None
+        file_paths = [
+            file_path.text if isinstance(file_path, Data) else file_path
+            for file_path in self.iter_paths()
+            if not (isinstance(file_path, Data) and file_path.data.get("deleted"))
+        ]
+        index = FormIndex(self.index_path)
+        try:
+            if build:
+                max_documents = getattr(self, "engine_max_documents", 100) or 100
+                index.build(file_paths, max_documents)
+            yield from index.query(predicates, output_keys, file_paths)
+        finally:
+            index.close()
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        index_mode = getattr(self, "index_mode", "Off")
+        if index_mode != "Off" and getattr(self, "index_path", None):
+            yield from self.iter_index_records(build=index_mode == "Build")
+            return
+
+        watch = self.get_watch()
+        if not getattr(self, "results_path", None):
+            file_paths = self.iter_paths()
+            if watch is not None:
+                file_paths = itertools.chain(file_paths, watch.watch)
+            yield from self.iter_run(file_paths, None)
+            return
+
+        # merge this run into the store, then answer with the whole stored set
+        for _ in self.iter_run(self.iter_paths(), ResultStore(self.results_path, self._results_signature())):
+            pass
+        store = ResultStore(self.results_path, self._results_signature())
+        try:
+            yield from store.records()
+        finally:
+            store.close()
+        if watch is not None:
+            # then every record the watch refreshes, committed one document at a time
+            store = ResultStore(self.results_path, self._results_signature(), flush_every=1)
+            yield from self.iter_run(watch.watch, store)
+
+    def iter_run(self, file_paths, store) -> Iterator[Dict[str, Any]]:
+        """Evaluate file_paths, merging them into store when there is one, and yield the passing records."""
+        manifests = ManifestUpdates()
+        # DirectoryPath items by path, recorded in their manifest once the result is committed
+        items = {}
+        if store is not None:
+            store.on_commit = manifests.commit
+
+        def incoming():
+            # a generator when the paths are streamed in by DirectoryPath
+            seen = set()
+            if store is not None and store.stale:
+                for file_path in store.paths():
+                    seen.add(file_path)
+                    yield file_path
+            for file_path in file_paths:
+                if isinstance(file_path, Data):
+                    if file_path.data.get("deleted"):
+                        manifests.add(file_path)
+                        if store is not None:
+                            store.delete(file_path.text)
+                        continue
+                    items[file_path.text] = file_path
+                    file_path = file_path.text
+                if file_path not in seen:
+                    yield file_path
+
+        try:
+            for file_path, record in self.iter_results(incoming()):
+                manifests.add(items.pop(file_path, None))
+                if store is not None:
+                    store.put(file_path, record)
+                elif len(manifests) >= ResultStore.FLUSH_EVERY:
+                    # nothing is stored, a document counts as done once it is evaluated
+                    manifests.commit()
+                if record is not None:
+                    yield record
+        finally:
+            if store is not None:
+                store.close()
+            manifests.close()
+
+    def iter_results(self, file_paths) -> Iterator[tuple]:
+        """Yield (file_path, record) per document, record is None when it did not pass."""
+        prescreen = self.get_prescreen(self.fields)
+        if prescreen is None:
+            yield from self.iter_evaluated(file_paths)
+            return
+
+        rejected = deque()
+
+        def screened():
+            for file_path in file_paths:
+                if prescreen.may_match(file_path):
+                    yield file_path
+                else:
+                    rejected.append(file_path)
+                    self._metrics.count("prescreen_rejected")
+
+        # rejected documents still reach the result store, as documents that did not pass
+        for item in self.iter_evaluated(screened()):
+            while rejected:
+                yield rejected.popleft(), None
+            yield item
+        while rejected:
+            yield rejected.popleft(), None
+
+    def get_prescreen(self, filters) -> PreScreen | None:
+        if not getattr(self, "prescreen", False):
+            return None
+        predicates = []
+        for filter_component in filters:
+            if hasattr(filter_component, "process") and hasattr(filter_component, "get_predicates"):
+                predicates.extend(filter_component.get_predicates() or [])
+        # every filter has to pass, so a key one of them requires is required of the document
+        keys = required_keys(predicates)
+        return PreScreen(keys) if keys else None
+
+    def iter_evaluated(self, file_paths) -> Iterator[tuple]:
         filters: list[Component] = self.fields
         output_keys = self.output_keys.data["output_keys"] if self.output_keys else None
-        result = []
+        workers = getattr(self, "workers", 1) or 1
+        max_documents = getattr(self, "engine_max_documents", 100) or 100
 
-        for file_path in file_paths:
-            if isinstance(file_path, Data):
-                file_path = file_path.text
+        cache = self.open_cache()
+        keys = self.get_projection(filters, output_keys) if cache is None else None
+        metrics = self.open_metrics()
+        leaks_enabled = LEAKS.enabled
+        if getattr(self, "track_leaks", False):
+            LEAKS.enabled = True
+        self._leaks = None
+        timeout = getattr(self, "document_timeout", 0) or None
+        memory_limit = (getattr(self, "document_memory_mb", 0) or 0) * 1024 * 1024 or None
+        self._failed = []
 
-            file = File()
-            if not file.open(file_path):
-                continue
+        try:
+            shards = getattr(self, "shards", 1) or 1
+            if shards > 1:
+                yield from self.run_sharded(file_paths, filters, output_keys, max_documents, keys, shards)
+                return
 
-            passed = True
-            for filter_component in filters:
-                if hasattr(filter_component, "process"):
-                    if not filter_component.process(file):
-                        passed = False
-                        break
-            if passed:
-                record = {"file_path": file_path}
-                if output_keys:
-                    for key in output_keys:
-                        record[key] = file.getFormValueByKey(key)
-                result.append(record)
-            file.close()
+            daemon_socket = getattr(self, "daemon_socket", None)
+            if daemon_socket:
+                self._daemon = ExtractionClient(daemon_socket, timeout)
+                if keys is not None and self.get_predicates(filters) is None:
+                    # the daemon cannot fetch a key a filter asks for later, load every form
+                    keys = None
+            elif workers > 1 or timeout or memory_limit:
+                predicates = self.get_predicates(filters)
+                if predicates is None and (timeout or memory_limit):
+                    msg = "Every filter must describe itself as predicates to enforce document limits in a worker."
+                    raise ValueError(msg)
+                if predicates is not None:
+                    pool = FormWorkerPool(
+                        workers, predicates, output_keys, max_documents, cache, keys, metrics, timeout, memory_limit
+                    )
+                    # a list the component shares, so failures show up while the batch runs
+                    pool.failed = self._failed
+                    yield from pool.map(file_paths)
+                    return
+
+            if getattr(self, "vectorized_filters", False):
+                predicates = self.get_predicates(filters)
+                if predicates is not None:
+                    # small batches keep the time to the first streamed record short
+                    plan = PredicatePlan(predicates, 16 if getattr(self, "stream", False) else PredicatePlan.BATCH_SIZE)
+                    if keys is None and cache is None:
+                        # the plan knows every key it reads, documents load only those and the output keys
+                        keys = list(dict.fromkeys([key for key, _ in plan.columns] + list(output_keys or [])))
+                    yield from self.run_plan(plan, file_paths, output_keys, max_documents, cache, keys, metrics)
+                    return
+
+            yield from self.run_sequential(file_paths, filters, output_keys, max_documents, cache, keys, metrics)
+        finally:
+            if cache is not None:
+                self.status = cache.stats()
+                cache.close()
+            if getattr(self, "_daemon", None) is not None:
+                self._daemon.close()
+                self._daemon = None
+            if metrics.enabled and getattr(self, "metrics_sink", None):
+                metrics.write(self.metrics_sink)
+            if LEAKS.enabled:
+                # taken once the run's engines are closed, tracking then goes back to the process setting
+                self._leaks = LEAKS.report()
+            LEAKS.enabled = leaks_enabled
+
+    def run_sharded(self, file_paths, filters, output_keys, max_documents, keys, shards) -> Iterator[tuple]:
+        predicates = self.get_predicates(filters)
+        if predicates is None:
+            msg = "Every filter must describe itself as predicates to be evaluated in shards."
+            raise ValueError(msg)
+        shard_dir = getattr(self, "shard_dir", None)
+        if not shard_dir:
+            msg = "A sharded run needs a shard directory every node can reach."
+            raise ValueError(msg)
+
+        run = ShardedRun(shard_dir)
+        strategy = "size" if getattr(self, "shard_strategy", "Path Hash") == "Byte Size" else "hash"
+        plan = run.prepare(list(file_paths), shards, strategy, predicates, output_keys, keys, max_documents)
+        pending = run.pending(plan)
+        if pending and getattr(self, "shard_nodes", "Local Processes") == "Local Processes":
+            pending = run.run_local(pending, getattr(self, "shard_retries", 1) or 0)
+        if pending:
+            msg = (
+                f"Shards {pending} of {shard_dir} are not finished. Run `python form_filter.py shard {shard_dir} <n>` "
+                "for each of them, then run the flow again to merge."
+            )
+            raise ValueError(msg)
+
+        for line in run.merge(plan):
+            if "error" in line:
+                self._failed.append({"file_path": line["file_path"], "reason": line["error"]})
+            yield line["file_path"], line["record"]
+
+    def get_projection(self, filters, output_keys) -> List[str] | None:
+        """Keys the run will look at, None to load every form of each document."""
+        if not getattr(self, "project_keys", False):
+            return None
+        keys = list(output_keys or [])
+        for filter_component in filters:
+            if hasattr(filter_component, "get_predicates"):
+                keys.extend(p["key"] for p in filter_component.get_predicates() or [])
+        # filters without predicates still work, File fetches the keys they ask for on demand
+        return list(dict.fromkeys(keys))
+
+    def open_cache(self) -> FormCache | None:
+        cache_path = getattr(self, "cache_path", None)
+        if not cache_path:
+            return None
+        return FormCache(
+            cache_path,
+            max_entries=getattr(self, "cache_max_entries", 100000) or 100000,
+            hash_content=bool(getattr(self, "cache_hash_content", False)),
+        )
+
+    def open_metrics(self) -> RunMetrics | NullMetrics:
+        if getattr(self, "collect_metrics", False):
+            self._metrics = RunMetrics(getattr(self, "metrics_slowest", 10) or 0)
+        else:
+            self._metrics = NULL_METRICS
+        return self._metrics
+
+    def load_file(self, file_path, engines, cache, keys=None, metrics=NULL_METRICS) -> File | None:
+        form_map = cache.get(file_path) if cache is not None else None
+        if form_map is not None:
+            metrics.count("cache_hits")
+            return File.fromFormMap(form_map)
+        daemon = getattr(self, "_daemon", None)
+        if daemon is not None:
+            start = metrics.clock()
+            try:
+                response = daemon.extract(file_path, keys)
+            except OSError as e:
+                # timed out or lost the connection: this document fails, the batch goes on
+                response = {"form_map": None, "error": repr(e)}
+                daemon.reconnect()
+            metrics.since("daemon", start)
+            if response["form_map"] is None:
+                self._failed.append({"file_path": file_path, "reason": response.get("error")})
+                metrics.skipped(file_path)
+                return None
+            if cache is not None:
+                cache.put(file_path, response["form_map"])
+            return File.fromFormMap(response["form_map"])
+        file = File()
+        start = metrics.clock()
+        if not file.openDocument(file_path, pool=engines):
+            self._failed.append({"file_path": file_path, "reason": "could not be opened"})
+            metrics.skipped(file_path)
+            return None
+        start = metrics.since("open", start)
+        with file.closingOnError():
+            file.loadForms(keys)
+            metrics.since("enumerate", start)
+            if cache is not None:
+                cache.put(file_path, file.getFormMap())
+        return file
+
+    def run_plan(self, plan, file_paths, output_keys, max_documents, cache, keys=None, metrics=NULL_METRICS) -> Iterator[tuple]:
+        rows = []
+        records = []
+        engines = EnginePool(max_documents)
 
-        return result
+        try:
+            for file_path in file_paths:
+                document_start = metrics.clock()
+                file = self.load_file(file_path, engines, cache, keys, metrics)
+                if file is None:
+                    yield file_path, None
+                    continue
+                with file:
+                    start = metrics.clock()
+                    rows.append(plan.extract(file))
+                    records.append(build_record(file, file_path, output_keys))
+                    start = metrics.since("extract", start)
+                    file.close()
+                    metrics.since("close", start)
+                metrics.document(file_path, metrics.clock() - document_start, file.bridge_calls)
+                if len(rows) >= plan.batch_size:
+                    start = metrics.clock()
+                    selection = plan.select(rows, records)
+                    metrics.since("filter", start)
+                    for record, selected in zip(records, selection):
+                        yield record["file_path"], selected
+                    rows = []
+                    records = []
+
+            start = metrics.clock()
+            selection = plan.select(rows, records)
+            metrics.since("filter", start)
+            for record, selected in zip(records, selection):
+                yield record["file_path"], selected
+        finally:
+            engines.close()
+
+    def run_sequential(self, file_paths, filters, output_keys, max_documents, cache, keys=None, metrics=NULL_METRICS) -> Iterator[tuple]:
+        engines = EnginePool(max_documents)
+        filters = [f for f in filters if hasattr(f, "process")]
+        stats = [FILTER_STATS.get(self._filter_stats_key(f)) for f in filters]
+        run_stats = [FilterStats() for _ in filters]
+        warmup = self.FILTER_WARMUP - min((s.calls for s in stats), default=self.FILTER_WARMUP)
+        order = list(range(len(filters)))
+        if warmup <= 0:
+            order.sort(key=lambda i: stats[i].rank())
+        self._filter_run = (filters, stats, order, run_stats)
+        stages = [f"filter:{self._filter_label(f)}" for f in filters]
+
+        try:
+            for n, file_path in enumerate(file_paths):
+                document_start = metrics.clock()
+                file = self.load_file(file_path, engines, cache, keys, metrics)
+                if file is None:
+                    yield file_path, None
+                    continue
+
+                # the document is released even when a filter raises
+                with file:
+                    passed = True
+                    error = None
+                    for i in order:
+                        start = time.perf_counter()
+                        try:
+                            filter_passed = filters[i].process(file)
+                        except Exception as e:
+                            # in wiring order another filter might have rejected the document first
+                            error = error or e
+                            continue
+                        seconds = time.perf_counter() - start
+                        stats[i].add(filter_passed, seconds)
+                        run_stats[i].add(filter_passed, seconds)
+                        metrics.time(stages[i], seconds)
+                        if not filter_passed:
+                            passed = False
+                            # warm-up documents go through every filter so pass rates are not skewed by the order
+                            if n >= warmup:
+                                break
+                    if passed and error is not None:
+                        raise error
+                    if n + 1 == warmup or (n + 1 > warmup and (n + 1 - warmup) % self.FILTER_REORDER_EVERY == 0):
+                        order.sort(key=lambda i: stats[i].rank())
+                    start = metrics.clock()
+                    record = build_record(file, file_path, output_keys) if passed else None
+                    start = metrics.since("extract", start)
+                    file.close()
+                    metrics.since("close", start)
+                metrics.document(file_path, metrics.clock() - document_start, file.bridge_calls)
+                yield file_path, record
+        finally:
+            engines.close()
 
     def build_data(self) -> Data:
-        processed_data = self.build_main()
+        processed_data = self.get_results()
+        if isinstance(processed_data, RecordStream):
+            # consumers iterate the records while documents are still being processed
+            return Data(data={"items": iter(processed_data)})
+        if isinstance(processed_data, RecordTable):
+            # Langflow serializes this output as plain dicts; once they exist the table is only a
+            # second copy of the same rows, so the dicts replace it as the shared result
+            processed_data = list(processed_data)
+            self._results_cache = (self._results_cache[0], processed_data)
         return Data(data={"items": processed_data})
 
+    def build_filter_stats(self) -> Data:
+        self.complete_run()
+        filters, stats, order, run_stats = getattr(self, "_filter_run", ([], [], [], []))
+        items = []
+        for position, i in enumerate(order):
+            items.append({
+                "position": position,
+                "filter": getattr(filters[i], "display_name", type(filters[i]).__name__),
+                "key": self._filter_key(filters[i]),
+                # this run
+                "calls": run_stats[i].calls,
+                "pass_rate": run_stats[i].pass_rate,
+                "avg_ms": run_stats[i].cost * 1000,
+                # learned over every run with the same filter settings, the order follows these
+                "learned_calls": stats[i].calls,
+                "learned_pass_rate": stats[i].pass_rate,
+                "learned_avg_ms": stats[i].cost * 1000,
+            })
+        return Data(data={"filters": items})
+
+    def build_metrics(self) -> Data:
+        self.complete_run()
+        data = getattr(self, "_metrics", NULL_METRICS).to_dict()
+        if getattr(self, "_leaks", None) is not None:
+            data["leaks"] = self._leaks
+        return Data(data=data)
+
+    def build_failed(self) -> list[Data]:
+        self.complete_run()
+        return [Data(data=item) for item in getattr(self, "_failed", [])]
+
     def build_paths(self) -> list[Data]:
-        processed_data = self.build_main()
+        processed_data = self.get_results()
+        if isinstance(processed_data, RecordTable):
+            # the path column of the result, shared rather than copied
+            return processed_data.paths()
+        if self.get_watch() is not None:
+            return (record["file_path"] for record in processed_data)
         file_paths = [record["file_path"] for record in processed_data]
         return file_paths
+
+
+def main(argv=None):
+    import argparse
+    import signal
+
+    parser = argparse.ArgumentParser(description="Form filter tasks that run outside of a flow.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    shard = commands.add_parser("shard", help="evaluate one shard of a sharded run")
+    shard.add_argument("directory", help="shard directory of the run")
+    shard.add_argument("shard", type=int, help="shard number, from 0")
+    serve = commands.add_parser("serve", help="run the extraction daemon")
+    serve.add_argument("socket", help="path of the Unix socket to listen on")
+    serve.add_argument("--max-documents", type=int, default=100, help="documents per engine before it is replaced")
+    args = parser.parse_args(argv)
+
+    if args.command == "shard":
+        ShardedRun(args.directory).run(args.shard)
+    elif args.command == "serve":
+        server = ExtractionServer(args.socket, args.max_documents)
+        # a stopped daemon removes its socket, so the next one can bind to it
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+
+if __name__ == "__main__":
+    main()
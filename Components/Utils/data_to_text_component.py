@@ -1,6 +1,9 @@
+from collections.abc import Sequence
+from itertools import islice
+
 from langflow.custom import Component
-from langflow.io import Output, DataInput
-from langflow.schema import Data
+from langflow.io import BoolInput, DataInput, IntInput, MessageTextInput, Output
+from langflow.schema.message import Message
 
 class DataToTextComponent(Component):
     display_name = "Data To Text"
@@ -15,27 +18,104 @@ class DataToTextComponent(Component):
             input_types=["Data"],
             required=True,
         ),
+        IntInput(
+            name="max_rows",
+            display_name="Rows Per Page",
+            info="Maximum number of records rendered in one message. 0 renders every record.",
+            value=0,
+            advanced=True,
+        ),
+        IntInput(
+            name="max_bytes",
+            display_name="Bytes Per Page",
+            info="Size budget of one message in bytes. 0 disables the budget.",
+            value=0,
+            advanced=True,
+        ),
+        MessageTextInput(
+            name="page_token",
+            display_name="Page Token",
+            info="Continuation token printed at the end of the previous page. Leave empty for the first page.",
+            value="",
+            advanced=True,
+        ),
+        BoolInput(
+            name="show_summary",
+            display_name="Show Summary",
+            info="Start the message with the number of records and end it with the range shown.",
+            value=False,
+            advanced=True,
+        ),
     ]
     outputs = [
         Output(display_name="Message", name="text", method="build_output"),
     ]
 
-    def get_text_from_processed_data(self, processed_data: list[str]) -> str:
-        """Convert processed_data into a readable text format."""
-        text_lines = []
-        for person in processed_data:
-            for key, record in person.items():
-                text_lines.append(f"  {key}: {record}")
-                text_lines.append("")
-    
-        return "\n".join(text_lines)
-         
+    PAGE_TOKEN_PREFIX = "page:"
+
+    def get_text_from_record(self, record) -> str:
+        return "".join(f"  {key}: {value}\n\n" for key, value in record.items())
+
+    def parse_page_token(self, token) -> int:
+        """Offset of the first record of the page a token points to."""
+        token = (token or "").strip()
+        if not token:
+            return 0
+        if not token.startswith(self.PAGE_TOKEN_PREFIX) or not token[len(self.PAGE_TOKEN_PREFIX):].isdigit():
+            msg = f"Invalid page token: {token!r}"
+            raise ValueError(msg)
+        return int(token[len(self.PAGE_TOKEN_PREFIX):])
+
+    def iter_text_from_processed_data(self, processed_data, offset=0, total=None):
+        """Yield the text of one page record by record, so memory depends on the page size only."""
+        max_rows = getattr(self, "max_rows", 0) or 0
+        max_bytes = getattr(self, "max_bytes", 0) or 0
+        show_summary = getattr(self, "show_summary", False)
+
+        if show_summary:
+            count = f"{total} records" if total is not None else "Records"
+            yield f"{count}, showing from record {offset + 1}\n\n"
+
+        rows = 0
+        size = 0
+        more = False
+        if isinstance(processed_data, Sequence):
+            # jump to the page, records before it are never read
+            records = (processed_data[i] for i in range(offset, len(processed_data)))
+        else:
+            records = islice(processed_data, offset, None)
+        for record in records:
+            text = self.get_text_from_record(record)
+            length = len(text.encode())
+            if (max_rows and rows >= max_rows) or (max_bytes and rows and size + length > max_bytes):
+                # records are pulled one at a time, the one read past the page stays unrendered
+                more = True
+                break
+            if max_bytes and length > max_bytes:
+                # a single record larger than the whole budget is cut
+                text = text.encode()[:max_bytes].decode(errors="ignore") + " ...\n\n"
+                length = max_bytes
+            rows += 1
+            size += length
+            yield text
+
+        if show_summary:
+            if rows:
+                yield f"Shown records {offset + 1}-{offset + rows}"
+            else:
+                yield "No records to show"
+            yield f" of {total}\n" if total is not None else "\n"
+        if more:
+            yield f"More records: continue with page token {self.PAGE_TOKEN_PREFIX}{offset + rows}\n"
+
     def build_output(self) -> Message:
-        #msg = f"{self.dict_list}"
-        #raise ValueError(msg)
         fields = self.dict_list.data["items"]
-        text = f"{self.get_text_from_processed_data(fields)}"
+        offset = self.parse_page_token(getattr(self, "page_token", ""))
+        if not isinstance(fields, Sequence):
+            # a streaming FormFilter hands over an iterator, the chat output streams it
+            return Message(text=self.iter_text_from_processed_data(fields, offset))
+        text = "".join(self.iter_text_from_processed_data(fields, offset, len(fields)))
         message = Message(
             text=text,
         )
-        return message
\ No newline at end of file
+        return message
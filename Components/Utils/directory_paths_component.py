@@ -1,13 +1,352 @@
-from langflow.base.data.utils import (
-    TEXT_FILE_TYPES,
-    retrieve_file_paths,
-)
+import hashlib
+import os
+import queue
+import select
+import sqlite3
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator
+
+from langflow.base.data.utils import TEXT_FILE_TYPES
 from langflow.custom import Component
 from langflow.io import BoolInput, IntInput, MessageTextInput, MultiselectInput
 from langflow.schema import Data
 from langflow.template import Output
 
 
+def scan_directory(
+    path: str,
+    types: list[str],
+    *,
+    load_hidden: bool = False,
+    recursive: bool = False,
+    depth: int = 0,
+    max_concurrency: int = 1,
+    use_multithreading: bool = False,
+    silent_errors: bool = False,
+) -> Iterator[str]:
+    """Yield matching file paths as soon as their directory has been read.
+
+    Follows retrieve_file_paths: a non-zero depth limits how many directory
+    levels are read (depth 1 is the top level only), otherwise all levels
+    are read when recursive is set. With use_multithreading up to
+    max_concurrency directories are read at the same time with os.scandir,
+    so paths from different directories arrive in no particular order.
+    """
+    if not os.path.isdir(path):
+        msg = f"Path {path} must exist and be a directory."
+        raise ValueError(msg)
+
+    suffixes = tuple(f".{t}" for t in types)
+    if depth:
+        max_level = depth - 1
+    else:
+        max_level = None if recursive else 0
+
+    def read(directory, level):
+        files = []
+        subdirectories = []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if not load_hidden and entry.name.startswith("."):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    if max_level is None or level < max_level:
+                        subdirectories.append((entry.path, level + 1))
+                elif entry.is_file() and os.path.splitext(entry.name)[1] in suffixes:
+                    files.append(entry.path)
+        files.sort()
+        subdirectories.sort()
+        return files, subdirectories
+
+    if not use_multithreading or max_concurrency <= 1:
+        stack = [(path, 0)]
+        while stack:
+            directory, level = stack.pop()
+            try:
+                files, subdirectories = read(directory, level)
+            except OSError:
+                if not silent_errors:
+                    raise
+                continue
+            yield from files
+            stack.extend(reversed(subdirectories))
+        return
+
+    results = queue.Queue()
+    lock = threading.Lock()
+    scheduled = [1]
+    executor = ThreadPoolExecutor(max_workers=max_concurrency)
+
+    def scan(directory, level):
+        # every call puts exactly one message, after scheduling its subdirectories
+        try:
+            files, subdirectories = read(directory, level)
+        except Exception as e:
+            results.put((None, e))
+            return
+        with lock:
+            scheduled[0] += len(subdirectories)
+        for subdirectory, sublevel in subdirectories:
+            executor.submit(scan, subdirectory, sublevel)
+        results.put((files, None))
+
+    try:
+        executor.submit(scan, path, 0)
+        finished = 0
+        while True:
+            with lock:
+                if finished == scheduled[0]:
+                    break
+            files, error = results.get()
+            finished += 1
+            if error is not None:
+                if silent_errors and isinstance(error, OSError):
+                    continue
+                raise error
+            yield from files
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+class FileManifest:
+    """Files handed out by earlier runs, path -> (size, mtime_ns, sha256), kept in SQLite.
+
+    A scan only hands changes out: the consumer writes a file's row once it
+    has stored the result for it (Form Filter does so after its result
+    store), so changes a failed run never processed are handed out again.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, hash TEXT)"
+        )
+        self.connection.commit()
+        # confirmed rows, and the state of every file as this scan last handed it out
+        self.confirmed = {row[0]: row[1:] for row in self.connection.execute("SELECT * FROM files")}
+        self.files = dict(self.confirmed)
+        self.seen = set()
+
+    def changed(self, file_path: str) -> tuple | None:
+        """State of file_path if it is new or its content changed since it was last handed out."""
+        self.seen.add(file_path)
+        try:
+            stat = os.stat(file_path)
+            known = self.files.get(file_path)
+            if known is not None and known[0] == stat.st_size and known[1] == stat.st_mtime_ns:
+                return None
+            digest = hashlib.sha256()
+            with open(file_path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+        except OSError:
+            return None
+        state = (stat.st_size, stat.st_mtime_ns, digest.hexdigest())
+        self.files[file_path] = state
+        if known is None or known[2] != state[2]:
+            return state
+        # a touched but unchanged file: its new mtime can be recorded once the content itself is confirmed
+        confirmed = self.confirmed.get(file_path)
+        if confirmed is not None and confirmed[2] == state[2]:
+            self.confirmed[file_path] = state
+            self.connection.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)", (file_path, *state))
+            self.connection.commit()
+        return None
+
+    def discard(self, file_path: str):
+        """Stop tracking a file that is gone, its row is deleted by the consumer."""
+        self.files.pop(file_path, None)
+
+    def removed(self, under: str | None = None) -> list[str]:
+        """Discard and return known files that are gone: not seen by the scan, or below the directory under."""
+        if under is None:
+            gone = [p for p in self.files if p not in self.seen]
+        else:
+            prefix = os.path.join(under, "")
+            gone = [p for p in self.files if p.startswith(prefix)]
+        for file_path in gone:
+            self.discard(file_path)
+        return gone
+
+    def close(self):
+        self.connection.close()
+
+
+def changed_path(file_path: str, state: tuple, manifest: FileManifest) -> Data:
+    size, mtime_ns, digest = state
+    return Data(data={"text": file_path, "manifest": manifest.path, "size": size, "mtime_ns": mtime_ns, "hash": digest})
+
+
+def deleted_path(file_path: str, manifest: FileManifest) -> Data:
+    return Data(data={"text": file_path, "deleted": True, "manifest": manifest.path})
+
+
+def iter_changes(file_paths, manifest: FileManifest):
+    """Paths from a scan that are new or modified, then a deletion marker for each vanished one."""
+    manifest.seen = set()
+    for file_path in file_paths:
+        state = manifest.changed(file_path)
+        if state is not None:
+            yield changed_path(file_path, state, manifest)
+    for file_path in manifest.removed():
+        yield deleted_path(file_path, manifest)
+
+
+class WatchStream:
+    """Paths of a watched directory: the changes the scan found, then every later change, forever.
+
+    Iterating it yields both. Consumers that have to know where the scan
+    ends, like Form Filter merging results, read `scan` and `watch` instead.
+    """
+
+    endless = True
+
+    def __init__(self, scan, watch):
+        self.scan = scan
+        self.watch = watch
+
+    def __iter__(self):
+        yield from self.scan
+        yield from self.watch
+
+
+class Inotify:
+    """Just enough of Linux inotify, through libc, to watch a directory tree."""
+
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_IGNORED = 0x00008000
+    IN_ISDIR = 0x40000000
+    MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+    def __init__(self):
+        # only watch mode needs ctypes, and finding libc is slow
+        import ctypes
+        import ctypes.util
+
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self.fd = libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches = {}
+
+    def add(self, directory: str, level: int):
+        wd = self._add_watch(self.fd, os.fsencode(directory), self.MASK)
+        if wd >= 0:
+            self.watches[wd] = (directory, level)
+
+    def read(self, timeout: float) -> list[tuple]:
+        """(directory, level, mask, name) of the events that arrive within timeout seconds."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        data = os.read(self.fd, 1 << 16)
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = struct.unpack_from("iIII", data, offset)
+            name = os.fsdecode(data[offset + 16 : offset + 16 + length].rstrip(b"\0"))
+            offset += 16 + length
+            if mask & self.IN_IGNORED:
+                self.watches.pop(wd, None)
+            elif wd in self.watches:
+                events.append((*self.watches[wd], mask, name))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+def watch_directory(
+    path: str,
+    types: list[str],
+    manifest: FileManifest,
+    *,
+    load_hidden: bool = False,
+    recursive: bool = False,
+    depth: int = 0,
+    poll_interval: float = 2.0,
+):
+    """Yield files as they are added, changed or deleted, forever.
+
+    Uses inotify where libc provides it and falls back to rescanning every
+    poll_interval seconds elsewhere.
+    """
+    suffixes = tuple(f".{t}" for t in types)
+    if depth:
+        max_level = depth - 1
+    else:
+        max_level = None if recursive else 0
+
+    def scan(directory, level):
+        remaining = 0 if max_level is None else max_level - level + 1
+        return scan_directory(directory, types, load_hidden=load_hidden, recursive=True, depth=remaining)
+
+    try:
+        inotify = Inotify()
+    except (OSError, AttributeError):
+        inotify = None
+
+    if inotify is None:
+        while True:
+            time.sleep(poll_interval)
+            yield from iter_changes(scan(path, 0), manifest)
+
+    def add_tree(directory, level):
+        inotify.add(directory, level)
+        if max_level is not None and level >= max_level:
+            return
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            return
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False) and (load_hidden or not entry.name.startswith(".")):
+                add_tree(entry.path, level + 1)
+
+    try:
+        add_tree(path, 0)
+        while True:
+            for directory, level, mask, name in inotify.read(poll_interval):
+                if not load_hidden and name.startswith("."):
+                    continue
+                full_path = os.path.join(directory, name)
+                if mask & Inotify.IN_ISDIR:
+                    if max_level is not None and level >= max_level:
+                        continue
+                    if mask & (Inotify.IN_CREATE | Inotify.IN_MOVED_TO):
+                        add_tree(full_path, level + 1)
+                        for file_path in scan(full_path, level + 1):
+                            state = manifest.changed(file_path)
+                            if state is not None:
+                                yield changed_path(file_path, state, manifest)
+                    elif mask & (Inotify.IN_DELETE | Inotify.IN_MOVED_FROM):
+                        for file_path in manifest.removed(under=full_path):
+                            yield deleted_path(file_path, manifest)
+                    continue
+                if os.path.splitext(name)[1] not in suffixes:
+                    continue
+                if mask & (Inotify.IN_CLOSE_WRITE | Inotify.IN_MOVED_TO):
+                    state = manifest.changed(full_path)
+                    if state is not None:
+                        yield changed_path(full_path, state, manifest)
+                elif mask & (Inotify.IN_DELETE | Inotify.IN_MOVED_FROM):
+                    if full_path in manifest.files:
+                        manifest.discard(full_path)
+                        yield deleted_path(full_path, manifest)
+    finally:
+        inotify.close()
+
+
 class DirectoryPathComponent(Component):
     display_name = "Directory Paths"
     description = "Retrieve paths from a folder."
@@ -40,7 +379,7 @@ class DirectoryPathComponent(Component):
             name="max_concurrency",
             display_name="Max Concurrency",
             advanced=True,
-            info="Maximum concurrency for loading files.",
+            info="Maximum number of directories scanned at the same time when multithreading is enabled.",
             value=2,
         ),
         BoolInput(
@@ -67,6 +406,27 @@ class DirectoryPathComponent(Component):
             advanced=True,
             info="If true, multithreading will be used.",
         ),
+        BoolInput(
+            name="stream",
+            display_name="Stream Paths",
+            advanced=True,
+            info="If true, paths are handed downstream while the directory is still being scanned.",
+        ),
+        MessageTextInput(
+            name="manifest_path",
+            display_name="Manifest Path",
+            advanced=True,
+            info="SQLite file remembering the files processed so far. When set, only new or modified files are returned, "
+            "followed by a deletion marker for each file that disappeared. Form Filter records a file here once its "
+            "result is stored, so files a failed run did not process are returned again.",
+        ),
+        BoolInput(
+            name="watch",
+            display_name="Watch Directory",
+            advanced=True,
+            info="If true, keep running after the scan and hand over files as they are added, changed or deleted. "
+            "Requires a manifest and streams the paths; Form Filter then streams its results.",
+        ),
     ]
 
     outputs = [
@@ -92,12 +452,48 @@ class DirectoryPathComponent(Component):
 
         valid_types = types
 
-        file_paths = retrieve_file_paths(
+        file_paths = scan_directory(
             resolved_path,
+            valid_types,
             load_hidden=load_hidden,
             recursive=recursive,
             depth=depth,
-            types=valid_types,
+            max_concurrency=self.max_concurrency,
+            use_multithreading=self.use_multithreading,
+            silent_errors=self.silent_errors,
         )
 
-        return file_paths
+        manifest_path = getattr(self, "manifest_path", None)
+        watch = getattr(self, "watch", False)
+        if watch and not manifest_path:
+            msg = "Watching a directory requires a manifest path."
+            raise ValueError(msg)
+        if watch:
+            manifest = FileManifest(manifest_path)
+            return WatchStream(iter_changes(file_paths, manifest), self.iter_watch(resolved_path, valid_types, manifest))
+        if manifest_path:
+            file_paths = self.iter_manifest_changes(file_paths, manifest_path)
+
+        if self.stream:
+            return file_paths
+        return list(file_paths)
+
+    def iter_manifest_changes(self, file_paths, manifest_path):
+        manifest = FileManifest(manifest_path)
+        try:
+            yield from iter_changes(file_paths, manifest)
+        finally:
+            manifest.close()
+
+    def iter_watch(self, resolved_path, types, manifest):
+        try:
+            yield from watch_directory(
+                resolved_path,
+                types,
+                manifest,
+                load_hidden=self.load_hidden,
+                recursive=self.recursive,
+                depth=self.depth,
+            )
+        finally:
+            manifest.close()
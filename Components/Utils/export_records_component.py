@@ -0,0 +1,238 @@
+import csv
+import itertools
+import json
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+from langflow.custom import Component
+from langflow.io import DataInput, DropdownInput, IntInput, MessageTextInput, Output
+from langflow.schema import Data
+
+
+def column_type(value) -> str | None:
+    """Column type of a record value, following the types File.getFormValue returns."""
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, (int, float)):
+        # only date forms give numbers: milliseconds since the epoch
+        return "timestamp"
+    return "string"
+
+
+def type_columns(schema, records, first_row=0):
+    """Give the untyped columns of schema the type of their first value that is not None.
+
+    A value of another type in an already typed column is an error rather
+    than something to coerce: it would silently change the column's meaning.
+    """
+    for row, record in enumerate(records, first_row):
+        for key, kind in schema.items():
+            value_kind = column_type(record.get(key))
+            if value_kind is None:
+                continue
+            if kind is None:
+                schema[key] = value_kind
+                kind = value_kind
+            elif value_kind != kind:
+                msg = f"Column {key!r} holds {kind} values, but record {row} has a {value_kind}: {record.get(key)!r}"
+                raise ValueError(msg)
+
+
+def convert(value, kind):
+    if value is None:
+        return None
+    if kind == "timestamp":
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return None
+        return datetime.fromtimestamp(value / 1000, tz=timezone.utc)
+    if kind == "boolean":
+        return value if isinstance(value, bool) else None
+    return value if isinstance(value, str) else str(value)
+
+
+def text_value(value) -> str | None:
+    if isinstance(value, datetime):
+        return value.isoformat(timespec="milliseconds")
+    return value
+
+
+class JsonlWriter:
+    # columns can still be typed after the writer is created
+    fixed_schema = False
+
+    def __init__(self, f, schema):
+        self.f = f
+        self.schema = schema
+
+    def write(self, rows):
+        for row in rows:
+            self.f.write(json.dumps({key: text_value(value) for key, value in row.items()}) + "\n")
+
+    def close(self):
+        pass
+
+
+class CsvWriter:
+    fixed_schema = False
+
+    def __init__(self, f, schema):
+        self.writer = csv.writer(f)
+        self.writer.writerow(list(schema))
+
+    def write(self, rows):
+        for row in rows:
+            values = []
+            for value in row.values():
+                if isinstance(value, bool):
+                    value = "true" if value else "false"
+                values.append(text_value(value))
+            self.writer.writerow(values)
+
+    def close(self):
+        pass
+
+
+class ParquetWriter:
+    # the Parquet schema is written up front
+    fixed_schema = True
+
+    def __init__(self, f, schema):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            msg = "Parquet export needs pyarrow, install it with `pip install pyarrow`."
+            raise ImportError(msg) from e
+
+        schema = {key: kind or "string" for key, kind in schema.items()}
+        types = {"timestamp": pa.timestamp("ms", tz="UTC"), "boolean": pa.bool_(), "string": pa.string()}
+        self.pa = pa
+        self.schema = pa.schema([(key, types[kind]) for key, kind in schema.items()])
+        self.writer = pq.ParquetWriter(f, self.schema)
+
+    def write(self, rows):
+        if not rows:
+            return
+        columns = {name: [row[name] for row in rows] for name in self.schema.names}
+        # one row group per batch keeps memory bounded by the batch size
+        self.writer.write_table(self.pa.Table.from_pydict(columns, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+# batches held back, at most, to type the columns of a fixed schema
+TYPE_LOOKAHEAD_BATCHES = 16
+
+WRITERS = {
+    "JSONL": (JsonlWriter, "w"),
+    "CSV": (CsvWriter, "w"),
+    "Parquet": (ParquetWriter, "wb"),
+}
+
+
+class ExportRecordsComponent(Component):
+    display_name = "Export Records"
+    name = "ExportRecords"
+    icon = "file-down"
+    description: str = "Writes FormFilter records to a JSONL, CSV or Parquet file with typed columns."
+    inputs = [
+        DataInput(
+            name="dict_list",
+            display_name="Data",
+            info="Records to export, as produced by the Form Filter.",
+            input_types=["Data"],
+            required=True,
+        ),
+        MessageTextInput(
+            name="path",
+            display_name="Path",
+            info="File the records are written to. It is replaced once the export is complete.",
+            required=True,
+        ),
+        DropdownInput(
+            name="format",
+            display_name="Format",
+            info="JSONL and CSV write dates as ISO 8601 UTC timestamps, Parquet as timestamp columns. Parquet needs pyarrow.",
+            options=list(WRITERS),
+            value="JSONL",
+        ),
+        IntInput(
+            name="batch_size",
+            display_name="Batch Size",
+            info="Records held in memory at a time. A column takes the type of its first value; for Parquet up to 16 "
+            "batches are held back until every column has one.",
+            value=1024,
+            advanced=True,
+        ),
+    ]
+    outputs = [
+        Output(display_name="Export", name="export", method="build_output"),
+    ]
+
+    def iter_batches(self, records):
+        batch_size = max(1, self.batch_size or 1024)
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def export(self, records, path, file_format) -> Dict[str, Any]:
+        writer_class, mode = WRITERS[file_format]
+        batches = self.iter_batches(records)
+        first = next(batches, [])
+        # the columns are the keys of the first batch, each typed by its first value that is not None
+        schema: Dict[str, str | None] = dict.fromkeys(key for record in first for key in record)
+        type_columns(schema, first)
+        held = [first]
+        rows = len(first)
+        if writer_class.fixed_schema:
+            while None in schema.values() and len(held) < TYPE_LOOKAHEAD_BATCHES:
+                batch = next(batches, None)
+                if batch is None:
+                    break
+                type_columns(schema, batch, rows)
+                held.append(batch)
+                rows += len(batch)
+            # still without a value: only None has been seen, a later value has to be a string
+            schema = {key: kind or "string" for key, kind in schema.items()}
+
+        rows = 0
+        # written next to the target and renamed, readers never see a partial file
+        tmp = f"{path}.tmp"
+        try:
+            with open(tmp, mode, **({"newline": ""} if mode == "w" else {})) as f:
+                writer = writer_class(f, schema)
+                try:
+                    for n, batch in enumerate(itertools.chain(held, batches)):
+                        if n >= len(held):
+                            type_columns(schema, batch, rows)
+                        converted = self.convert_rows(batch, schema)
+                        writer.write(converted)
+                        rows += len(converted)
+                finally:
+                    writer.close()
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        return {"path": path, "format": file_format, "rows": rows, "columns": {k: v or "string" for k, v in schema.items()}}
+
+    def convert_rows(self, batch, schema) -> List[Dict[str, Any]]:
+        # records share the schema of the first batch, keys it does not know are dropped
+        return [{key: convert(record.get(key), kind) for key, kind in schema.items()} for record in batch]
+
+    def build_output(self) -> Data:
+        records = self.dict_list.data["items"]
+        result = self.export(records, self.path, self.format)
+        self.status = f"{result['rows']} records written to {result['path']}"
+        return Data(data=result)
+